@@ -11,6 +11,7 @@ import datetime
 from typing import TYPE_CHECKING, Optional, Dict, List
 from config import lastfm
 from utils.logging import log, Ansi
+from utils.repository import LastfmRepository
 from objects import glob
 
 if TYPE_CHECKING:
@@ -20,14 +21,8 @@ class LastFM(commands.Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
         self.api_key = lastfm
-        self.base_url = "http://ws.audioscrobbler.com/2.0/"
-        self.http_client = httpx.AsyncClient(
-            timeout=30.0,
-            follow_redirects=True
-        )
-        
-    async def cog_unload(self) -> None:
-        await self.http_client.aclose()
+        self.http_client = glob.http.get("lastfm")
+        self.lastfm = LastfmRepository()
         
     async def fetch_lastfm_data(self, username: str) -> Optional[dict]:
         params = {
@@ -38,7 +33,7 @@ class LastFM(commands.Cog):
         }
         
         try:
-            response = await self.http_client.get(self.base_url, params=params)
+            response = await self.http_client.get("/2.0/", params=params)
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -54,7 +49,7 @@ class LastFM(commands.Cog):
         }
         
         try:
-            response = await self.http_client.get(self.base_url, params=params)
+            response = await self.http_client.get("/2.0/", params=params)
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -67,12 +62,12 @@ class LastFM(commands.Cog):
         usage: !nowplaying
         """
         if not username:
-            from_db = await glob.db.fetch('select username from lastfm where id = %s', [str(ctx.author.id)])
+            from_db = await self.lastfm.get_username(ctx.author.id)
             if not from_db:
                 await ctx.send("you must provide an username!, to set lastfm username: `!setlastfm <username>`")
                 return
             
-            username = from_db['username']
+            username = from_db
 
         data = await self.fetch_lastfm_data(username)
         user = await self.fetch_user_info(username)
@@ -96,19 +91,7 @@ class LastFM(commands.Cog):
             await ctx.send("you must provide an username!")
             return
         
-        user_id = str(ctx.author.id)
-        hi = await glob.db.fetch('select * from lastfm where id = %s', [user_id])
-
-        if hi:
-            await glob.db.execute(
-                'update lastfm set id = %s, username = %s where id = %s',
-                [user_id, username, user_id]
-            )
-        else:
-            await glob.db.execute(
-                'insert into lastfm (id, username) values (%s, %s)',
-                [user_id, username]
-            )
+        await self.lastfm.set_username(ctx.author.id, username)
 
         await ctx.send(f"profile set for {username}!")
 
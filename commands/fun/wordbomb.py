@@ -10,6 +10,8 @@ import random
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Dict, Any, Optional, Set
 
+from objects import glob
+
 if TYPE_CHECKING:
     from main import Bot
 
@@ -49,35 +51,27 @@ class WordBomb(commands.Cog):
         if word.lower() in self.english_word_cache:
             return True
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f'https://api.dictionaryapi.dev/api/v2/entries/en/{word}',
-                    timeout=2.0
-                )
-                if response.status_code == 200:
-                    self.english_word_cache.add(word.lower())
-                    return True
-                return False
-            except (httpx.RequestError, asyncio.TimeoutError):
-                return False
+        try:
+            response = await glob.http.get("dictionary").get(f'entries/en/{word}')
+            if response.status_code == 200:
+                self.english_word_cache.add(word.lower())
+                return True
+            return False
+        except (httpx.RequestError, asyncio.TimeoutError):
+            return False
 
     async def _get_random_word(self) -> str:
         if self.cached_words:
             return random.choice(list(self.cached_words))
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    'https://random-word-api.herokuapp.com/word?lang=es',
-                    timeout=2.0
-                )
-                word = response.json()[0]
-                if await self._is_english_word(word):
-                    return word
-                return "game"
-            except:
-                return "game"
+        try:
+            response = await glob.http.get("random_word").get('/word', params={'lang': 'es'})
+            word = response.json()[0]
+            if await self._is_english_word(word):
+                return word
+            return "game"
+        except:
+            return "game"
 
     async def _update_game_status(self, ctx: commands.Context, game_state: State) -> None:
         remaining_time = int(game_state.end_time - time.time())
@@ -3,12 +3,16 @@ from typing import List
 available_commands: List[str] = [
     'setprefix',
     'prefix',
-    'resetprefix'
+    'resetprefix',
+    'setserver',
+    'server'
 ]
 
 from .prefix import Prefix
+from .server import Server
 
 __all__ = [
     'Prefix',
+    'Server',
     'available_commands'
 ]
\ No newline at end of file
@@ -9,12 +9,13 @@ from utils.prefixHelper import PrefixHelper
 if TYPE_CHECKING:
     from main import Bot
 
+prefix_manager = PrefixHelper()
+
 async def get_prefix(bot: Bot, message: discord.Message) -> str:
-    """get the prefix for a specific guild"""
+    """get the prefix for a specific guild, from memory once the cache is loaded"""
     if message.guild is None:
         return '!'
     
-    prefix_manager = PrefixHelper()
     return await prefix_manager.get_prefix(message.guild.id)
 
 class Prefix(commands.Cog):
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from discord.ext import commands
+from typing import TYPE_CHECKING
+
+from objects import glob
+from utils.serverHelper import ServerHelper
+
+if TYPE_CHECKING:
+    from main import Bot
+
+class Server(commands.Cog):
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.serverH = ServerHelper()
+
+    @commands.command(name='setserver', description="change the default osu! server for this server")
+    @commands.has_permissions(administrator=True)
+    async def set_server(self, ctx: commands.Context, server: str) -> None:
+        """
+        change the default osu! server for this server
+        usage: `!setserver <server>`
+        """
+        if server not in glob.servers:
+            await ctx.send(f"unknown server, available: {', '.join(f'`{s}`' for s in glob.servers.servers)}")
+            return
+
+        await self.serverH.set_server(ctx.guild.id, None if server == glob.servers.default else server)
+        await ctx.send(f'default server has been changed to: `{server}`')
+
+    @commands.command(name='server', description='show the default osu! server for this server')
+    async def show_server(self, ctx: commands.Context) -> None:
+        """show the default osu! server for this server"""
+        server = await self.serverH.get_server(ctx.guild.id) or glob.servers.default
+
+        await ctx.send(f'current server is: `{server}`\nother servers: {", ".join(f"`{s}`" for s in glob.servers.servers if s != server) or "none"}')
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Server(bot))
@@ -1,4 +1,10 @@
 
 from .api import ApiClient
+from .models import ApiError, Beatmap, Score, MapScore, PlayerScores, PlayerInfo, PlayerStats, PlayerProfile
+from .policy import CircuitOpen
+from .servers import ServerRegistry
 
-__all__ = ["ApiClient"]
\ No newline at end of file
+__all__ = [
+    "ApiClient", "ApiError", "CircuitOpen", "ServerRegistry",
+    "Beatmap", "Score", "MapScore", "PlayerScores", "PlayerInfo", "PlayerStats", "PlayerProfile",
+]
\ No newline at end of file
@@ -1,24 +1,253 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import random
+import time
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 import httpx
+import orjson
 import config
 
+from commands.osu.OsuApi.policy import TokenBucket, CircuitBreaker
+from commands.osu.OsuApi.models import ApiError, Beatmap, PlayerProfile, PlayerScores, decode
+
+# NOTE: how long a response is fresh for, per endpoint (or endpoint:scope) in seconds
+#       after that it's still served for another ttl while it gets refreshed in the background
+DEFAULT_TTLS: Dict[str, float] = {
+    "get_map_info": 6 * 60 * 60, # maps barely change
+    "get_map_scores": 0, # NOTE: usecases/map_scores.py keeps its own, incrementally refreshed copy
+    "get_player_info": 30,
+    "get_player_scores:best": 10,
+    "get_player_scores:recent": 0, # XXX: !rs right after a play (and the tracker) must see that play
+}
+
+# NOTE: never answered from a stale copy, an old top play list reads like a wrong one
+NO_STALE = {"get_player_scores:best"}
+
+CacheKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+class ResponseCache:
+    """size-bounded ttl cache of decoded api responses, shared by every ApiClient."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, Tuple[float, Any]] = OrderedDict()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[Tuple[float, Any]]:
+        """(age in seconds, response) or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        self._entries.move_to_end(key)
+        fetched_at, data = entry
+        return time.monotonic() - fetched_at, data
+
+    def put(self, key: CacheKey, data: Any) -> None:
+        self._entries[key] = (time.monotonic(), data)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+class RequestCoalescer:
+    """lets identical in-flight requests share one upstream call."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+
+        self.requests = 0
+        self.coalesced = 0
+
+    async def run(self, key: CacheKey, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+
+        if task is None:
+            self.requests += 1
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+
+        # NOTE: shield so a cancelled command doesn't cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    def _done(self, key: CacheKey, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        # XXX: mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+response_cache = ResponseCache(getattr(config, 'ApiCacheMaxEntries', 2048))
+request_coalescer = RequestCoalescer()
+
+# NOTE: one limiter and breaker per server, no matter how many clients talk to it
+rate_limiters: Dict[str, TokenBucket] = {}
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class ApiStats:
+    def __init__(self) -> None:
+        self.retries = 0
+        self.failures = 0
+
+api_stats = ApiStats()
+
 class ApiClient:
-    def __init__(self, server: str = config.Bancho):
-        """API client for Bancho.py based osu! server."""
+    def __init__(self, server: str = config.Bancho, client: Optional[httpx.AsyncClient] = None):
+        """API client for Bancho.py based osu! server.
+        `client` comes from the shared http registry, otherwise we make (and own) our own."""
         self.server = server
         self.key = config.BanchoApiKey  # api key
-        self.client = httpx.AsyncClient(base_url=f"https://api.{self.server}/v1/", timeout=5.0)
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            base_url=f"https://api.{self.server}/v1/",
+            timeout=getattr(config, 'ApiTimeout', 5.0),
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=getattr(config, 'ApiMaxConnections', 10),
+                max_keepalive_connections=getattr(config, 'ApiMaxKeepalive', 5),
+            ),
+        )
+        self.cache = response_cache
+        self.coalescer = request_coalescer
+        self.ttls = {**DEFAULT_TTLS, **getattr(config, 'ApiCacheTTL', {})}
+        self._refreshing: Dict[CacheKey, asyncio.Task] = {}
+
+        self.retries: int = getattr(config, 'ApiRetries', 2)
+        self.retry_backoff: float = getattr(config, 'ApiRetryBackoff', 0.5)
+
+        if server not in rate_limiters:
+            rate_limiters[server] = TokenBucket(
+                rate=getattr(config, 'ApiRateLimit', 10.0),
+                burst=getattr(config, 'ApiRateBurst', 20),
+            )
+            circuit_breakers[server] = CircuitBreaker(
+                failure_threshold=getattr(config, 'ApiBreakerThreshold', 5),
+                reset_after=getattr(config, 'ApiBreakerResetAfter', 30.0),
+            )
+
+        self.limiter = rate_limiters[server]
+        self.breaker = circuit_breakers[server]
+
+    def _cache_key(self, endpoint: str, params: dict) -> CacheKey:
+        return (self.server, endpoint, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+    async def _request(self, endpoint: str, params: dict) -> Any:
+        """GET with rate limiting, retries and the circuit breaker; every endpoint we use is idempotent.
+        the response is decoded into records here, so bad payloads fail before anything is cached."""
+        for attempt in range(self.retries + 1):
+            # XXX: wait for a token before check(), it can make this the half-open trial and
+            #      nothing may await between that and the try below or a cancel strands it
+            await self.limiter.acquire()
+            self.breaker.check()
+
+            try:
+                response = await self.client.get(endpoint, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    # NOTE: 4xx means the server is fine, it just didn't like us (e.g. 404 player)
+                    self.breaker.record_success()
+                    response.raise_for_status()
+
+                    try:
+                        data = orjson.loads(response.content)
+                    except orjson.JSONDecodeError as e:
+                        raise ApiError(f"{endpoint} didn't return json: {e}")
+
+                    return decode(endpoint, data)
+
+                error: Exception = httpx.HTTPStatusError(
+                    f"{response.status_code} from {endpoint}", request=response.request, response=response
+                )
+            except httpx.RequestError as e:
+                # NOTE: transport errors, but also broken compression and redirect loops, the server's fault either way
+                error = e
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception:
+                # XXX: ApiError and 4xx come after record_success, the server answered so they don't count
+                #      against it. anything else ends a half-open trial without a verdict, let the next one try
+                self.breaker.abandon()
+                raise
+
+            api_stats.failures += 1
+            self.breaker.record_failure()
+
+            if attempt == self.retries:
+                raise error
 
-    async def _get(self, endpoint: str, params: dict) -> dict:
-        response = await self.client.get(endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
+            # NOTE: exponential backoff with full jitter
+            api_stats.retries += 1
+            await asyncio.sleep(random.uniform(0, self.retry_backoff * (2 ** attempt)))
+
+        raise AssertionError("unreachable")
+
+    async def _fetch(self, endpoint: str, params: dict) -> Any:
+        key = self._cache_key(endpoint, params)
+        return await self.coalescer.run(key, lambda: self._request(endpoint, params))
+
+    async def _refresh(self, key: CacheKey, endpoint: str, params: dict) -> None:
+        try:
+            self.cache.put(key, await self._fetch(endpoint, params))
+        except Exception:
+            # NOTE: keep serving the stale copy, the next miss will surface the error
+            pass
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def _get(self, endpoint: str, params: dict, cache_name: Optional[str] = None) -> Any:
+        cache_name = cache_name or endpoint
+        ttl = self.ttls.get(cache_name, 0)
+        if ttl <= 0:
+            return await self._fetch(endpoint, params)
+
+        key = self._cache_key(endpoint, params)
+        cached = self.cache.get(key)
+
+        if cached is not None:
+            age, data = cached
+
+            if age < ttl:
+                self.cache.hits += 1
+                return data
+
+            # NOTE: stale-while-revalidate, answer now and refresh behind the user's back
+            if age < ttl * 2 and cache_name not in NO_STALE:
+                self.cache.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, endpoint, params))
+                return data
+
+        self.cache.misses += 1
+        data = await self._fetch(endpoint, params)
+        self.cache.put(key, data)
+        return data
 
     async def get_player_scores(self, scope: str, user_id: Optional[int] = None,
                                  username: Optional[str] = None, mods_arg: Optional[str] = None,
-                                 mode_arg: Optional[int] = None) -> dict:
+                                 mode_arg: Optional[int] = None) -> PlayerScores:
         params = {
             "name": username,
             "id": user_id,
@@ -27,9 +256,10 @@ class ApiClient:
             "scope": scope # recent | best
         }
         
-        return await self._get("get_player_scores", {k: v for k, v in params.items() if v is not None})
+        return await self._get("get_player_scores", {k: v for k, v in params.items() if v is not None},
+                               cache_name=f"get_player_scores:{scope}")
 
-    async def get_map_info(self, map_id: Optional[int] = None, md5: Optional[str] = None) -> dict:
+    async def get_map_info(self, map_id: Optional[int] = None, md5: Optional[str] = None) -> Beatmap:
         params = {
             "id": map_id,
             "md5": md5
@@ -38,7 +268,7 @@ class ApiClient:
         return await self._get("get_map_info", {k: v for k, v in params.items() if v is not None})
 
     async def get_player_info(self, scope: str, user_id: Optional[int] = None,
-                               username: Optional[str] = None) -> dict:
+                               username: Optional[str] = None) -> PlayerProfile:
         params = {
             "id": user_id,
             "name": username,
@@ -47,18 +277,20 @@ class ApiClient:
 
         return await self._get("get_player_info", {k: v for k, v in params.items() if v is not None})
     
-    async def get_map_scores(self, scope: str, user_id: Optional[int] = None,
-                                 username: Optional[str] = None, mods_arg: Optional[str] = None,
-                                 mode_arg: Optional[int] = None) -> dict:
+    async def get_map_scores(self, scope: str, map_id: Optional[int] = None,
+                             md5: Optional[str] = None, mods_arg: Optional[str] = None,
+                             mode_arg: Optional[int] = None, limit: Optional[int] = None) -> dict:
         params = {
-            "name": username,
-            "id": user_id,
+            "id": map_id,
+            "md5": md5,
             "mods": mods_arg,
             "mode": mode_arg,
+            "limit": limit, # 1-100
             "scope": scope # recent | best
         }
         
         return await self._get("get_map_scores", {k: v for k, v in params.items() if v is not None})
                 
     async def close(self):
-        await self.client.aclose()
\ No newline at end of file
+        if self._owns_client:
+            await self.client.aclose()
\ No newline at end of file
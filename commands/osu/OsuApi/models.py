@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# NOTE: only the fields we actually render are kept, everything else in the payload is dropped
+#       at the boundary, so a session holding 100 scores doesn't hold 100 copies of the whole json
+
+class ApiError(Exception):
+    """the server answered, but not with something we can use."""
+
+class Beatmap(NamedTuple):
+    id: int
+    set_id: int
+    md5: str
+    artist: str
+    title: str
+    version: str
+    max_combo: int
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Beatmap:
+        return cls(
+            id=int(data['id']),
+            set_id=int(data['set_id']),
+            md5=str(data['md5']),
+            artist=str(data['artist']),
+            title=str(data['title']),
+            version=str(data['version']),
+            max_combo=int(data['max_combo']),
+        )
+
+class Score(NamedTuple):
+    id: int
+    score: int
+    pp: float
+    acc: float
+    max_combo: int
+    mods: int
+    mods_readable: str
+    n300: int
+    n100: int
+    n50: int
+    nmiss: int
+    grade: str
+    mode: int
+    play_time: datetime
+    beatmap: Beatmap
+    status: int = 0 # 2 = best on the map
+
+    # NOTE: only for refx, other servers don't send these
+    aim: int = 0
+    aim_value: Optional[int] = None
+    arc: int = 0
+    ar_value: Optional[float] = None
+    hdr: int = 0
+    cs: int = 0
+    tw: int = 0
+    twval: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], beatmap: Optional[Beatmap] = None) -> Score:
+        return cls(
+            id=int(data['id']),
+            score=int(data['score']),
+            pp=float(data['pp']),
+            acc=float(data['acc']),
+            max_combo=int(data['max_combo']),
+            mods=int(data['mods']),
+            mods_readable=str(data['mods_readable']),
+            n300=int(data['n300']),
+            n100=int(data['n100']),
+            n50=int(data['n50']),
+            nmiss=int(data['nmiss']),
+            grade=str(data['grade']),
+            mode=int(data['mode']),
+            play_time=datetime.fromisoformat(data['play_time']),
+            beatmap=beatmap or Beatmap.from_dict(data['beatmap']),
+            status=int(data.get('status', 0)),
+            aim=int(data.get('aim', 0)),
+            aim_value=data.get('aim_value'),
+            arc=int(data.get('arc', 0)),
+            ar_value=data.get('ar_value'),
+            hdr=int(data.get('hdr', 0)),
+            cs=int(data.get('cs', 0)),
+            tw=int(data.get('tw', 0)),
+            twval=data.get('twval'),
+        )
+
+class PlayerScores(NamedTuple):
+    player_id: int
+    player_name: str
+    scores: List[Score]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> PlayerScores:
+        # NOTE: a top 100 is mostly a handful of maps played over and over, share those records
+        beatmaps: Dict[str, Beatmap] = {}
+        scores = []
+
+        for score in data['scores']:
+            beatmap = beatmaps.get(score['beatmap']['md5'])
+            if beatmap is None:
+                beatmap = beatmaps[score['beatmap']['md5']] = Beatmap.from_dict(score['beatmap'])
+
+            scores.append(Score.from_dict(score, beatmap))
+
+        return cls(
+            player_id=int(data['player']['id']),
+            player_name=str(data['player']['name']),
+            scores=scores,
+        )
+
+class MapScore(NamedTuple):
+    player_id: int
+    player_name: str
+    score: Score
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], beatmap: Beatmap) -> MapScore:
+        # NOTE: map leaderboards don't repeat the beatmap for every score, the caller knows it
+        return cls(
+            player_id=int(data['userid']),
+            player_name=str(data['player_name']),
+            score=Score.from_dict(data, beatmap),
+        )
+
+def decode_map_scores(data: Dict[str, Any], beatmap: Beatmap) -> List[MapScore]:
+    """get_map_scores is returned undecoded (it needs the beatmap), this finishes the job."""
+    try:
+        return [MapScore.from_dict(score, beatmap) for score in data['scores']]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ApiError(f"malformed get_map_scores response ({type(e).__name__}: {e})")
+
+class PlayerInfo(NamedTuple):
+    id: int
+    name: str
+    country: str
+    creation_time: int
+    latest_activity: int
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> PlayerInfo:
+        return cls(
+            id=int(data['id']),
+            name=str(data['name']),
+            country=str(data['country']),
+            creation_time=int(data['creation_time']),
+            latest_activity=int(data['latest_activity']),
+        )
+
+class PlayerStats(NamedTuple):
+    pp: int
+    acc: float
+    rank: int
+    country_rank: int
+    plays: int
+    playtime: int
+    xh_count: int
+    x_count: int
+    sh_count: int
+    s_count: int
+    a_count: int
+    xp: int = 0 # NOTE: only for refx
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> PlayerStats:
+        return cls(
+            pp=int(data['pp']),
+            acc=float(data['acc']),
+            rank=int(data['rank']),
+            country_rank=int(data['country_rank']),
+            plays=int(data['plays']),
+            playtime=int(data['playtime']),
+            xh_count=int(data['xh_count']),
+            x_count=int(data['x_count']),
+            sh_count=int(data['sh_count']),
+            s_count=int(data['s_count']),
+            a_count=int(data['a_count']),
+            xp=int(data.get('xp', 0)),
+        )
+
+class PlayerProfile(NamedTuple):
+    info: PlayerInfo
+    stats: Dict[int, PlayerStats] # mode -> stats
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> PlayerProfile:
+        return cls(
+            info=PlayerInfo.from_dict(data['player']['info']),
+            stats={int(mode): PlayerStats.from_dict(stats) for mode, stats in data['player']['stats'].items()},
+        )
+
+def _map_info(data: Dict[str, Any]) -> Beatmap:
+    return Beatmap.from_dict(data['map'])
+
+# NOTE: endpoint -> record, endpoints that aren't here are returned as plain dicts (still status checked)
+DECODERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "get_player_scores": PlayerScores.from_dict,
+    "get_player_info": PlayerProfile.from_dict,
+    "get_map_info": _map_info,
+}
+
+def decode(endpoint: str, data: Dict[str, Any]) -> Any:
+    """turn a decoded payload into records, raising ApiError if it isn't what we expect."""
+    if data.get('status') != 'success':
+        raise ApiError(f"{endpoint} failed: {data.get('status', 'no status')}")
+
+    decoder = DECODERS.get(endpoint)
+    if decoder is None:
+        return data
+
+    try:
+        return decoder(data)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ApiError(f"malformed {endpoint} response ({type(e).__name__}: {e})")
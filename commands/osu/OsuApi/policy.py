@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from typing import Literal
+
+class CircuitOpen(Exception):
+    """raised instead of waiting on a server we already know is down."""
+
+class TokenBucket:
+    """client-side rate limiter, `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # NOTE: the lock keeps waiters in order, first come first served
+        async with self._lock:
+            self._refill()
+
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waits += 1
+                self.wait_time += delay
+
+                await asyncio.sleep(delay)
+                self._refill()
+
+            self._tokens -= 1
+
+class CircuitBreaker:
+    """stops sending requests for a while after too many consecutive failures."""
+
+    def __init__(self, failure_threshold: int, reset_after: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+
+        self.state: Literal["closed", "open", "half-open"] = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+
+        self.opens = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        """raise CircuitOpen if requests shouldn't go through right now."""
+        if self.state == "half-open":
+            # NOTE: a trial request is already on its way, wait for its verdict
+            self.rejected += 1
+            raise CircuitOpen("server looks down, checking if it's back")
+
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_after:
+                self.rejected += 1
+                raise CircuitOpen(f"server looks down, not trying again for {self.retry_in:.0f}s")
+
+            # NOTE: let one request through to see if it's back
+            self.state = "half-open"
+
+    @property
+    def retry_in(self) -> float:
+        return max(0.0, self.reset_after - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+
+    def abandon(self) -> None:
+        """the trial request never finished (cancelled), let the next one try."""
+        if self.state == "half-open":
+            self.state = "open"
+
+    def record_failure(self) -> None:
+        self._failures += 1
+
+        if self.state == "half-open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import config
+
+from typing import Dict, Iterable, List
+
+from commands.osu.OsuApi.api import ApiClient
+from utils.http import HttpClientRegistry, PoolConfig
+
+class ServerRegistry:
+    """one ApiClient (and so one connection pool) per bancho.py server, shared by every cog."""
+
+    def __init__(self, default: str, servers: Iterable[str], http: HttpClientRegistry) -> None:
+        self.default = default
+        self.servers: List[str] = [default, *(server for server in servers if server != default)]
+        self.http = http
+        self._clients: Dict[str, ApiClient] = {}
+
+        for server in self.servers:
+            self.http.register(self.pool_name(server), PoolConfig(
+                base_url=f"https://api.{server}/v1/",
+                timeout=getattr(config, 'ApiTimeout', 5.0),
+                max_connections=getattr(config, 'ApiMaxConnections', 10),
+                max_keepalive=getattr(config, 'ApiMaxKeepalive', 5),
+                http2=True,
+                follow_redirects=False,
+                warmup_url="get_player_count",
+            ))
+
+    @staticmethod
+    def pool_name(server: str) -> str:
+        return f"bancho:{server}"
+
+    def __contains__(self, server: str) -> bool:
+        return server in self.servers
+
+    def get(self, server: str | None = None) -> ApiClient:
+        server = server or self.default
+        if server not in self.servers:
+            raise KeyError(f"unknown server {server}")
+
+        client = self._clients.get(server)
+        if client is None:
+            client = self._clients[server] = ApiClient(server, self.http.get(self.pool_name(server)))
+
+        return client
+
+    async def close(self) -> None:
+        # NOTE: the http pools belong to the registry, it closes them
+        self._clients.clear()
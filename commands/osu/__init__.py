@@ -1,20 +1,29 @@
 from typing import List
 
 available_commands: List[str] = [
-    'setprofile'
-    'profile'
-    'recent'
-    'top'
+    'setprofile',
+    'profile',
+    'recent',
+    'top',
+    'compare',
+    'leaderboard',
+    'track',
+    'untrack',
+    'tracking'
 ]
 
 from .setprofile import SetProfile
 from .profile import Profile
 from .score import Score
+from .track import Track
+from .leaderboard import Leaderboard
 
 __all__ = [
     'SetProfile',
     'Profile',
     'Score',
+    'Track',
+    'Leaderboard',
     'available_commands'
 ]
 
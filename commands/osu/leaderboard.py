@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import discord
+import config
+
+from discord.ext import commands, tasks
+from typing import TYPE_CHECKING
+
+from utils.logging import log, Ansi
+from utils.OsuMapping import Mode, safe_name
+from utils.args import ArgParsing
+from utils.repository import write_behind
+from usecases.leaderboards import LeaderboardJob, METRICS, guild_leaderboard, registered_names
+
+if TYPE_CHECKING:
+    from main import Bot
+
+class Leaderboard(commands.Cog):
+    def __init__(self, bot: Bot) -> None:
+        """guild leaderboards of registered members, from stats refreshed in the background"""
+        self.bot: Bot = bot
+        self.mode = Mode
+        self.arg = ArgParsing
+        self.job = LeaderboardJob(concurrency=getattr(config, 'LeaderboardConcurrency', 4))
+
+        self.refresh_stats.start()
+
+    def cog_unload(self) -> None:
+        self.refresh_stats.cancel()
+
+    @tasks.loop(minutes=getattr(config, 'LeaderboardRefreshMinutes', 30))
+    async def refresh_stats(self) -> None:
+        try:
+            await self.job.run(self.bot.guilds)
+        except Exception as e:
+            log(f"leaderboard refresh failed: {e}", Ansi.RED)
+
+    @refresh_stats.before_loop
+    async def before_refresh_stats(self) -> None:
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="leaderboard", aliases=['lb'],
+                      description="leaderboard of this server's registered players")
+    async def leaderboard(self, ctx: commands.Context, *, args: str = None) -> None:
+        """leaderboard of this server's registered players (`!setprofile`)
+        usage: `!lb (pp|acc|rank|plays) (+mode) (-s server)`
+        """
+        if ctx.guild is None:
+            return
+
+        server, args = await self.arg.parse_server(self, ctx, args)
+        if server is None:
+            return
+
+        metric = "pp"
+        mode = 0
+        for arg in (args or "").split():
+            if arg in METRICS:
+                metric = arg
+            elif arg.startswith('+'):
+                mode = self.mode.from_string(arg[1:])
+            else:
+                await ctx.send(f"unknown option `{arg}`, sort by one of: {', '.join(f'`{m}`' for m in METRICS)}")
+                return
+
+        # NOTE: someone who just ran !setprofile should show up, their profile might not be in mysql yet
+        await write_behind.flush()
+
+        names = await registered_names(member.id for member in ctx.guild.members)
+
+        rows = await guild_leaderboard(server, mode, names.values(), metric)
+        if not rows:
+            await ctx.send("no stats yet, register with `!setprofile` and check back in a bit.")
+            return
+
+        lines = []
+        for i, row in enumerate(rows[:10], 1):
+            lines.append(
+                f"**{i}.** {row['name']} ▸ **{row['pp']:,}pp** ▸ {row['acc']:.2f}% "
+                f"▸ #{row['rank']:,} ▸ {row['plays']:,} plays"
+            )
+
+        own_name = names.get(ctx.author.id)
+        if own_name is not None:
+            for i, row in enumerate(rows, 1):
+                if i > 10 and safe_name(row['name']) == safe_name(own_name):
+                    lines.append(f"...\n**{i}.** {row['name']} ▸ **{row['pp']:,}pp** ▸ {row['acc']:.2f}% "
+                                 f"▸ #{row['rank']:,} ▸ {row['plays']:,} plays")
+                    break
+
+        embed = discord.Embed(
+            title=f"{ctx.guild.name} {self.mode.to_string(mode)} leaderboard by {metric}",
+            description="\n".join(lines),
+            color=0x2ECC71
+        )
+
+        embed.set_footer(text=f"{len(rows)} players | on {server} | updated every "
+                              f"{int(self.refresh_stats.minutes)} minutes")
+        embed.timestamp = min(row['updated_at'] for row in rows)
+
+        await ctx.send(embed=embed)
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Leaderboard(bot))
@@ -2,40 +2,45 @@ from __future__ import annotations
 
 import discord
 import config
-import os
 import httpx
 import asyncio
 
-from pathlib import Path
 from discord.ext import commands
 from typing import TYPE_CHECKING, List, Dict, Optional, Literal, NamedTuple, Tuple
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
-from commands.osu.OsuApi.api import ApiClient
-
 from utils.logging import log, Ansi
 from utils.OsuMapping import Mode, grade_emojis
-from utils.args import ArgParsing
+from utils.args import ArgParsing, SERVER_ARG
+
+from usecases.performance import ScoreParams, PerformanceResult
+from usecases.calculation import CalculationBusy
+from usecases.beatmaps import BeatmapMismatch, BeatmapDownloadError
+from usecases.map_scores import create_map_score_index
 
-from usecases.performance import calculate_performances, ScoreParams, calculate_osu_tools
+from objects import glob
+from commands.osu.OsuApi.models import ApiError, Beatmap as ApiBeatmap, Score as ApiScore
 
 if TYPE_CHECKING:
     from main import Bot
 
 # NOTE: thanks mist for being on vc helping me rewriting this owo :D
-# TODO: compare
 
 # --- Data Classes and Types ---
 @dataclass
 class ScoreSession:
-    pages: List[List[Dict]]
+    pages: List[List[ApiScore]]
     current_page: int
     username: str
     player_id: int
     message: Optional[discord.Message]
     last_interaction: datetime
     command_type: Literal["recent", "top"]
+    server: str
+    prefetch_task: Optional[asyncio.Task] = None
+    rendered: Dict[int, discord.Embed] = field(default_factory=dict) # page -> finished embed
     
     @property
     def is_expired(self) -> bool:
@@ -45,170 +50,233 @@ class MapCalculation(NamedTuple):
     pp: float
     stars: float
     pp_if_fc: float
-    #pp_bancho: float
+    pp_bancho: Optional[float] = None
 
 # --- Helper Functions ---
 class ScoreUtils:
     @staticmethod
-    def fmt_score_details(score: Dict, beatmap: Dict, calc: MapCalculation) -> Dict[str, str]:
-        """format score details into readable strings."""
-        fcstr = f" ({calc.pp_if_fc}pp if FC)" if round(score['pp'], 2) != calc.pp_if_fc else ""
+    def fmt_score_details(score: ApiScore, beatmap: ApiBeatmap, calc: Optional[MapCalculation]) -> Dict[str, str]:
+        """format score details into readable strings, `calc` is None when the map couldn't be calculated."""
+        fcstr = f" ({calc.pp_if_fc}pp if FC)" if calc is not None and round(score.pp, 2) != calc.pp_if_fc else ""
+        bancho_str = f" (bancho: {calc.pp_bancho}pp)" if calc is not None and calc.pp_bancho is not None else ""
         modstr = "+"
         cheatvalue = None
 
         # XXX: remove DT if theres NC
-        modstr += score['mods_readable'].replace('DT', '') if 'NC' in score['mods_readable'] else score['mods_readable']
+        modstr += score.mods_readable.replace('DT', '') if 'NC' in score.mods_readable else score.mods_readable
 
         # NOTE: scorev2 shouldnt have cheatvalue since they are playing on stable
         if 'V2' not in modstr:
-            if score['mode'] > 3:
+            if score.mode > 3:
                 cheatvalue = (
-                    f"▸ AC: {score['aim_value'] if score['aim'] > 0 else 'Not used'} "
-                    f"▸ AR Changer: {score['ar_value'] if score['arc'] > 0 else 'Not used'} "
-                    f"▸ HD Remover: {'Yes' if score['hdr'] > 0 else 'Not used'}\n"
-                    f"▸ Timewarp: {score['twval'] if score['tw'] > 0 else 'Not used'} "
-                    f"▸ CS Changer: {'Yes' if score['cs'] > 0 else 'Not used'}"
+                    f"▸ AC: {score.aim_value if score.aim > 0 else 'Not used'} "
+                    f"▸ AR Changer: {score.ar_value if score.arc > 0 else 'Not used'} "
+                    f"▸ HD Remover: {'Yes' if score.hdr > 0 else 'Not used'}\n"
+                    f"▸ Timewarp: {score.twval if score.tw > 0 else 'Not used'} "
+                    f"▸ CS Changer: {'Yes' if score.cs > 0 else 'Not used'}"
                 )
             else:
                 cheatvalue = (
-                    f"▸ AC: {score['aim_value'] if score['aim'] > 0 else 'Not used'} "
-                    f"▸ AR Changer: {score['ar_value'] if score['arc'] > 0 else 'Not used'} "
-                    f"▸ HD Remover: {'Yes' if score['hdr'] > 0 else 'Not used'}"
+                    f"▸ AC: {score.aim_value if score.aim > 0 else 'Not used'} "
+                    f"▸ AR Changer: {score.ar_value if score.arc > 0 else 'Not used'} "
+                    f"▸ HD Remover: {'Yes' if score.hdr > 0 else 'Not used'}"
                 )
 
         # play_time
-        unix_playtime = datetime.fromisoformat(score['play_time']).timestamp()
+        unix_playtime = score.play_time.timestamp()
 
         return {
-            'title': f"{beatmap['artist']} - {beatmap['title']} [{beatmap['version']}]",
-            'pp_display': f"{round(score['pp'], 2)}pp{fcstr}", # (bancho: {calc.pp_bancho}pp)
-            'accuracy': f"{float(score['acc']):.2f}%",
-            'combo': f"{score['max_combo']}x/{beatmap['max_combo']}x",
-            'hits': f"[{score['n300']}/{score['n100']}/{score['n50']}/{score['nmiss']}]",
-            'score_display': f"{score['score']:,}",
+            'title': f"{beatmap.artist} - {beatmap.title} [{beatmap.version}]",
+            'pp_display': f"{round(score.pp, 2)}pp{fcstr}{bancho_str}",
+            'accuracy': f"{float(score.acc):.2f}%",
+            'combo': f"{score.max_combo}x/{beatmap.max_combo}x",
+            'hits': f"[{score.n300}/{score.n100}/{score.n50}/{score.nmiss}]",
+            'score_display': f"{score.score:,}",
             'mods': modstr,
-            'stars': f"{calc.stars}★",
+            'stars': f"{calc.stars}★" if calc is not None else "?★",
             'cheatval': cheatvalue if cheatvalue is not None else "",
             'scoreset': f"<t:{int(unix_playtime)}:R>"
         }
 
     @staticmethod
-    def create_pages(scores: List[Dict], page_size: int = 1) -> List[List[Dict]]:
+    def create_pages(scores: List[ApiScore], page_size: int = 1) -> List[List[ApiScore]]:
         """Split scores into pages."""
         return [scores[i:i + page_size] for i in range(0, len(scores), page_size)]
 
 # --- Map Calculator ---
 # NOTE: move this somewhere?
 class BeatmapCalculator:
-    CACHE_DIR = Path(".data")
-
-    def __init__(self):
-        self.CACHE_DIR.mkdir(exist_ok=True)
+    # NOTE: maps we can't get the exact version of, the score still renders, just without fc pp and stars
+    # XXX: osu.ppy.sh only serves the latest version, a BeatmapMismatch means the score is on an outdated map
+    UNCALCULABLE = (BeatmapMismatch, BeatmapDownloadError)
 
     async def download_map(self, beatmap_id: int, beatmap_md5: str) -> str:
-        """download and cache beatmap file."""
-        filepath = self.CACHE_DIR / f"{beatmap_md5}.osu"
-        
-        if not filepath.exists():
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"https://osu.ppy.sh/osu/{beatmap_id}")
-                if response.status_code != 200:
-                    raise Exception(f"Failed to download beatmap with id {beatmap_id}")
-                filepath.write_bytes(response.content)
-
-        return str(filepath)
-
-    async def calculate_map_stats(self, score: Dict, beatmap: Dict) -> MapCalculation:
-        """calculate map statistics if fc including PP and stars."""
-        beatmap_path = await self.download_map(beatmap['id'], beatmap['md5'])
-        
-        score_params = ScoreParams(
-            mode=score['mode'],
-            mods=score['mods'],
-            combo=beatmap['max_combo'],
+        """download and cache beatmap file, raises BeatmapMismatch if the map was updated since."""
+        return await glob.downloader.fetch(beatmap_id, beatmap_md5)
+
+    @staticmethod
+    def _fc_params(score: ApiScore, beatmap: ApiBeatmap) -> ScoreParams:
+        return ScoreParams(
+            mode=score.mode,
+            mods=score.mods,
+            combo=beatmap.max_combo,
             nmiss=0,
-            acc=score['acc'],
+            acc=score.acc,
 
             # NOTE: for refx
-            AC=score['aim_value'],
-            AR=score['ar_value'],
-            TW=score['twval'],
-            CS=score['cs'],
-            HD=score['hdr']
+            AC=score.aim_value,
+            AR=score.ar_value,
+            TW=score.twval,
+            CS=score.cs,
+            HD=score.hdr
         )
-        
-        calc = calculate_performances(beatmap_path, [score_params])[0]
-        #bancho_calc = calculate_osu_tools(beatmap_path, [score_params], "/home/ano/discord-bot/osu-tools")[0] # god..
-        
+
+    @staticmethod
+    def _to_map_calculation(score: ApiScore, calc: PerformanceResult, bancho_calc: Optional[Dict] = None) -> MapCalculation:
         return MapCalculation(
-            pp=round(score['pp'], 2),
+            pp=round(score.pp, 2),
             stars=round(float(calc['difficulty']['stars']), 2),
             pp_if_fc=round(calc['performance']['pp'], 2),
-            #pp_bancho=round(bancho_calc['performance']['pp'], 2)
+            pp_bancho=round(bancho_calc['performance']['pp'], 2) if bancho_calc else None
         )
 
+    async def _calculate(self, beatmap_path: str, beatmap_md5: str, score_params: List[ScoreParams],
+                         background: bool = False) -> Tuple[List[PerformanceResult], List[Optional[Dict]]]:
+        """refx calculation, plus osu-tools (bancho pp) if the workers are running."""
+        if glob.osu_tools is None:
+            calcs = await glob.calculator.calculate(beatmap_path, score_params, beatmap_md5, background)
+            return calcs, [None] * len(calcs)
+
+        # NOTE: osu-tools doesnt know about refx cheat values, it's only there for comparison
+        calcs, bancho_calcs = await asyncio.gather(
+            glob.calculator.calculate(beatmap_path, score_params, beatmap_md5, background),
+            glob.osu_tools.simulate(beatmap_path, score_params),
+            return_exceptions=True
+        )
+
+        if isinstance(calcs, BaseException):
+            raise calcs
+
+        if isinstance(bancho_calcs, BaseException):
+            # XXX: anything but a cancellation just means no bancho pp, it's not worth failing the command over
+            if not isinstance(bancho_calcs, Exception):
+                raise bancho_calcs
+
+            log(f"osu-tools calculation failed: {bancho_calcs}", Ansi.YELLOW)
+            bancho_calcs = [None] * len(calcs)
+
+        return calcs, bancho_calcs
+
+    async def calculate_map_stats(self, score: ApiScore, beatmap: ApiBeatmap, background: bool = False) -> Optional[MapCalculation]:
+        """calculate map statistics if fc including PP and stars, None if we can't get the map."""
+        try:
+            beatmap_path = await self.download_map(beatmap.id, beatmap.md5)
+        except self.UNCALCULABLE as e:
+            log(f"not calculating score {score.id}: {e}", Ansi.YELLOW)
+            return None
+        
+        score_params = self._fc_params(score, beatmap)
+        
+        calcs, bancho_calcs = await self._calculate(beatmap_path, beatmap.md5, [score_params], background)
+        
+        return self._to_map_calculation(score, calcs[0], bancho_calcs[0])
+
+    async def calculate_batch(self, scores: List[ApiScore], background: bool = False) -> List[Optional[MapCalculation]]:
+        """calculate a whole page of scores at once, results keep the order of `scores`.
+        scores on maps we can't get are None instead of failing the page."""
+        # NOTE: group by md5 so every map is downloaded and parsed only once
+        groups: Dict[str, List[int]] = {}
+        for i, score in enumerate(scores):
+            groups.setdefault(score.beatmap.md5, []).append(i)
+
+        async def calculate_group(beatmap_md5: str, indexes: List[int]) -> Tuple[List[int], Tuple[List[PerformanceResult], List[Optional[Dict]]]]:
+            beatmap = scores[indexes[0]].beatmap
+            try:
+                beatmap_path = await self.download_map(beatmap.id, beatmap_md5)
+            except self.UNCALCULABLE as e:
+                log(f"not calculating {len(indexes)} scores on beatmap {beatmap.id}: {e}", Ansi.YELLOW)
+                return indexes, ([], [])
+
+            score_params = [self._fc_params(scores[i], scores[i].beatmap) for i in indexes]
+            return indexes, await self._calculate(beatmap_path, beatmap_md5, score_params, background)
+
+        calcs = await asyncio.gather(*(
+            calculate_group(beatmap_md5, indexes) for beatmap_md5, indexes in groups.items()
+        ))
+
+        # NOTE: groups that came back empty stay None
+        results: List[Optional[MapCalculation]] = [None] * len(scores)
+        for indexes, (group_calcs, group_bancho_calcs) in calcs:
+            for i, calc, bancho_calc in zip(indexes, group_calcs, group_bancho_calcs):
+                results[i] = self._to_map_calculation(scores[i], calc, bancho_calc)
+
+        return results
+
 # --- Score Embed ---
 class ScoreEmbed:
     def __init__(self, server: str):
         self.server = server
         self.calculator = BeatmapCalculator()
 
-    async def create_single_score_embed(self, score: Dict, username: str, player_id: int) -> discord.Embed:
-        """recent command."""
-        beatmap = score['beatmap']
-        calc = await self.calculator.calculate_map_stats(score, beatmap)
+    async def create_single_score_embed(self, score: ApiScore, username: str, player_id: int,
+                                        calc: Optional[MapCalculation] = None, background: bool = False) -> discord.Embed:
+        """recent command, `calc` skips the calculation if the caller already has it."""
+        beatmap = score.beatmap
+        if calc is None:
+            calc = await self.calculator.calculate_map_stats(score, beatmap, background)
         details = ScoreUtils.fmt_score_details(score, beatmap, calc)
-        scoreset = f"▸ score set: {details['scoreset']}\n" if score['grade'] != 'F' else ''
+        scoreset = f"▸ score set: {details['scoreset']}\n" if score.grade != 'F' else ''
         
         embed = discord.Embed(
             description=(
-                f"▸ {grade_emojis.get(score['grade'], score['grade'])} "
+                f"▸ {grade_emojis.get(score.grade, score.grade)} "
                 f"▸ **{details['pp_display']}** ▸ {details['accuracy']}\n"
                 f"▸ {details['score_display']} ▸ {details['combo']} ▸ {details['hits']}\n"
                 f"{scoreset}"
                 f"{details['cheatval']} " # NOTE: only for refx
             ),
-            color=0x2ECC71 if score['grade'] != 'F' else 0xE74C3C
+            color=0x2ECC71 if score.grade != 'F' else 0xE74C3C
         )
         
-        if score['grade'] != 'F':
-            embed.description += f"▸ [Replay](https://api.{self.server}/v1/get_play?id={score['id']})" # NOTE: should be get_replay if not refx
+        if score.grade != 'F':
+            embed.description += f"▸ [Replay](https://api.{self.server}/v1/get_play?id={score.id})" # NOTE: should be get_replay if not refx
         
         embed.set_author(
             name=f"{details['title']} {details['mods']} [{details['stars']}]",
             icon_url=f"https://a.{self.server}/{player_id}",
-            url=f"https://osu.ppy.sh/b/{beatmap['id']}"
+            url=f"https://osu.ppy.sh/b/{beatmap.id}"
         )
-        embed.set_image(url=f"https://assets.ppy.sh/beatmaps/{beatmap['set_id']}/covers/cover.jpg")
+        embed.set_image(url=f"https://assets.ppy.sh/beatmaps/{beatmap.set_id}/covers/cover.jpg")
         embed.set_footer(text=f"on {self.server}")
         
         return embed
 
     async def create_multi_score_embed(
         self,
-        scores: List[Dict],
+        scores: List[ApiScore],
         username: str,
         player_id: int,
         current_page: int,
-        total_pages: int
+        total_pages: int,
+        background: bool = False
     ) -> discord.Embed:
         """top command."""
         embed = discord.Embed(title=f"Top plays for {username}", color=0x2ECC71)
+        calcs = await self.calculator.calculate_batch(scores, background)
         
-        for i, score in enumerate(scores, 1):
-            beatmap = score['beatmap']
-            calc = await self.calculator.calculate_map_stats(score, beatmap)
+        for i, (score, calc) in enumerate(zip(scores, calcs), 1):
+            beatmap = score.beatmap
             details = ScoreUtils.fmt_score_details(score, beatmap, calc)
-            scoreset = f"▸ score set: {details['scoreset']}\n" if score['grade'] != 'F' else ''
+            scoreset = f"▸ score set: {details['scoreset']}\n" if score.grade != 'F' else ''
             
             value = (
-                f"▸ {grade_emojis.get(score['grade'], score['grade'])} "
+                f"▸ {grade_emojis.get(score.grade, score.grade)} "
                 f"▸ **{details['pp_display']}** ▸ {details['accuracy']}\n"
                 f"▸ {details['score_display']} ▸ {details['combo']} ▸ {details['hits']}\n"
                 f"▸ {details['mods']} ▸ {details['stars']}\n"
                 f"{scoreset}"
                 f"{details['cheatval']}" # NOTE: only for refx
-                f" ▸ [Replay](https://api.{self.server}/v1/get_play?id={score['id']})" # NOTE: should be get_replay if not refx
+                f" ▸ [Replay](https://api.{self.server}/v1/get_play?id={score.id})" # NOTE: should be get_replay if not refx
             )
             
             embed.add_field(
@@ -250,22 +318,10 @@ class ScorePaginator(discord.ui.View):
         session.last_interaction = datetime.now()
         
         try:
-            if session.command_type == "top":
-                embed = await self.cog.embed_creator.create_multi_score_embed(
-                    session.pages[session.current_page],
-                    session.username,
-                    session.player_id,
-                    session.current_page,
-                    len(session.pages)
-                )
-            else:
-                embed = await self.cog.embed_creator.create_single_score_embed(
-                    session.pages[session.current_page][0],
-                    session.username,
-                    session.player_id
-                )
-                
+            embed = await self.cog.render_page(session, session.current_page)
             await interaction.response.edit_message(embed=embed)
+            self.cog.remember_map(interaction.channel_id, session.server, session.pages[session.current_page][0])
+            self.cog.start_prefetch(session)
         except Exception as e:
             log(f"error in pagination: {e}", Ansi.YELLOW)
             await interaction.response.send_message("an error occurred while updating the scores.", ephemeral=True)
@@ -277,25 +333,131 @@ class ScorePaginator(discord.ui.View):
                 await session.message.edit(view=None)
             except discord.NotFound:
                 pass
-            self.cog.sessions.pop(self.message_id, None)
+            self.cog.end_session(self.message_id)
 
 # --- Main Score Cog ---
 class Score(commands.Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot: Bot = bot
-        self.api = ApiClient()
-        self.server = config.Bancho
         self.mode = Mode
         self.arg = ArgParsing
         self.sessions: Dict[int, ScoreSession] = {}
-        self.embed_creator = ScoreEmbed(self.server)
+        self.embed_creators: Dict[str, ScoreEmbed] = {}
         self.player_id: Optional[int] = None
+        self.prefetch_pages: int = getattr(config, 'PrefetchPages', 2)
+
+        # NOTE: lru over the rendered pages of every session, (id(session), page) -> session
+        self.rendered_pages: OrderedDict[Tuple[int, int], ScoreSession] = OrderedDict()
+        self.max_rendered_pages: int = getattr(config, 'RenderedPagesMax', 256)
+
+        # NOTE: channel id -> (server, last score shown), what !c compares against
+        self.last_maps: OrderedDict[int, Tuple[str, ApiScore]] = OrderedDict()
+        self.max_last_maps: int = getattr(config, 'LastMapsMax', 1024)
+        self.map_scores = create_map_score_index(BeatmapCalculator().calculate_batch)
         
         self.cleanup_task = bot.loop.create_task(self._cleanup_sessions())
 
     def cog_unload(self):
         self.cleanup_task.cancel()
 
+        for message_id in list(self.sessions):
+            self.end_session(message_id)
+
+    def end_session(self, message_id: int) -> Optional[ScoreSession]:
+        session = self.sessions.pop(message_id, None)
+        if session is None:
+            return None
+
+        if session.prefetch_task:
+            session.prefetch_task.cancel()
+
+        for page in session.rendered:
+            self.rendered_pages.pop((id(session), page), None)
+        session.rendered.clear()
+
+        return session
+
+    def remember_map(self, channel_id: int, server: str, score: ApiScore) -> None:
+        self.last_maps[channel_id] = (server, score)
+        self.last_maps.move_to_end(channel_id)
+
+        while len(self.last_maps) > self.max_last_maps:
+            self.last_maps.popitem(last=False)
+
+    def embed_creator(self, server: str) -> ScoreEmbed:
+        embed_creator = self.embed_creators.get(server)
+        if embed_creator is None:
+            embed_creator = self.embed_creators[server] = ScoreEmbed(server)
+
+        return embed_creator
+
+    async def render_page(self, session: ScoreSession, page: int, background: bool = False) -> discord.Embed:
+        """embed for a page of a session, built once and then served from memory.
+        `background` renders (prefetching) back off with CalculationBusy while the pool is in use."""
+        key = (id(session), page)
+
+        embed = session.rendered.get(page)
+        if embed is not None:
+            self.rendered_pages.move_to_end(key)
+            return embed
+
+        if session.command_type == "top":
+            embed = await self.embed_creator(session.server).create_multi_score_embed(
+                session.pages[page],
+                session.username,
+                session.player_id,
+                page,
+                len(session.pages),
+                background=background
+            )
+        else:
+            embed = await self.embed_creator(session.server).create_single_score_embed(
+                session.pages[page][0],
+                session.username,
+                session.player_id,
+                background=background
+            )
+
+        session.rendered[page] = embed
+        self.rendered_pages[key] = session
+
+        while len(self.rendered_pages) > self.max_rendered_pages:
+            (_, old_page), old_session = self.rendered_pages.popitem(last=False)
+            old_session.rendered.pop(old_page, None)
+
+        return embed
+
+    def start_prefetch(self, session: ScoreSession) -> None:
+        """(re)start warming up the pages after the current one."""
+        if session.prefetch_task:
+            session.prefetch_task.cancel()
+
+        session.prefetch_task = asyncio.create_task(self._prefetch(session))
+
+    async def _prefetch(self, session: ScoreSession) -> None:
+        # NOTE: pages are rendered into the session, clicking → then just edits the message
+        start = session.current_page + 1
+        end = min(start + self.prefetch_pages, len(session.pages))
+
+        try:
+            for page in range(start, end):
+                if page in session.rendered:
+                    continue
+
+                # XXX: low priority, every job waits for a free worker instead of queueing behind users
+                while True:
+                    try:
+                        await self.render_page(session, page, background=True)
+                        break
+                    except CalculationBusy:
+                        # NOTE: whatever did get calculated is in the result cache, the retry is cheap
+                        await asyncio.sleep(0.25)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if config.DEBUG:
+                log(f"error prefetching scores: {e}", Ansi.YELLOW)
+
     async def _cleanup_sessions(self):
         while True:
             try:
@@ -306,7 +468,7 @@ class Score(commands.Cog):
                 ]
                 
                 for message_id in expired_sessions:
-                    session = self.sessions.pop(message_id)
+                    session = self.end_session(message_id)
                     if session.message:
                         try:
                             await session.message.edit(view=None)
@@ -325,55 +487,59 @@ class Score(commands.Cog):
         page_size: int
     ) -> None:
         """handle both recent and top score commands."""
+        server, args = await self.arg.parse_server(self, ctx, args)
+        if server is None:
+            return
+
         username, mode = await self.arg.parse_args(self, ctx, args)
         if username is None or mode is None:
             return
 
         try:
-            response = await self.api.get_player_scores(command_type, username=username, mode_arg=mode)
-            if response['status'] != 'success':
-                await ctx.send("failed to fetch scores.")
-                return
+            response = await glob.servers.get(server).get_player_scores(command_type, username=username, mode_arg=mode)
 
-            scores = response['scores']
+            scores = response.scores
             if not scores:
                 await ctx.send(f"no {command_type} scores found.")
                 return
 
-            self.player_id = response['player']['id']
+            self.player_id = response.player_id
 
             pages = ScoreUtils.create_pages(scores, page_size)
-            
-            if command_type == "best":
-                embed = await self.embed_creator.create_multi_score_embed(
-                    pages[0], username, self.player_id, 0, len(pages)
-                )
-            else:
-                embed = await self.embed_creator.create_single_score_embed(
-                    pages[0][0], username, self.player_id
-                )
+
+            session = ScoreSession(
+                pages=pages,
+                current_page=0,
+                username=username,
+                player_id=self.player_id,
+                message=None,
+                last_interaction=datetime.now(),
+                command_type="top" if command_type == "best" else "recent",
+                server=server
+            )
+
+            embed = await self.render_page(session, 0)
 
             message = await ctx.send(
-                f"{command_type.title()} score{'s' if command_type == 'best' else ''} for {response['player']['name']}:",
+                f"{command_type.title()} score{'s' if command_type == 'best' else ''} for {response.player_name}:",
                 embed=embed
             )
             
             view = ScorePaginator(self, message.id)
             await message.edit(view=view)
 
-            self.sessions[message.id] = ScoreSession(
-                pages=pages,
-                current_page=0,
-                username=username,
-                player_id=self.player_id,
-                message=message,
-                last_interaction=datetime.now(),
-                command_type="top" if command_type == "best" else "recent"
-            )
+            session.message = message
+            self.sessions[message.id] = session
+            self.start_prefetch(session)
+            self.remember_map(ctx.channel.id, server, scores[0])
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404: # XXX: might be wrong username?
-                await ctx.send(f"{username} not found in {self.server}")
+                await ctx.send(f"{username} not found in {server}")
+
+        except ApiError as e:
+            log(f"bad scores response from {server}: {e}", Ansi.YELLOW)
+            await ctx.send("failed to fetch scores.")
 
         except Exception as er:
             await ctx.send(f"failed to fetch scores: {er}")
@@ -386,6 +552,7 @@ class Score(commands.Cog):
         - `!r ano +rx!std`
         - `!r @rieki +vn!ctb`
         - `!r +vn!std`
+        - `!r ano -s refx.online`
         """
         await self._handle_score_command(ctx, args, "recent", 1)
 
@@ -397,8 +564,71 @@ class Score(commands.Cog):
         - `!t ano +ap!std`
         - `!t +rx!std`
         - `!t @nipa +vn!std`
+        - `!t ano -s refx.online`
         """
         await self._handle_score_command(ctx, args, "best", 5)
 
+    @commands.command(name="compare", aliases=['c'],
+                      description="compare a player's score on the last map shown in this channel")
+    async def compare(self, ctx: commands.Context, *, args: str = None) -> None:
+        """compare a player's score on the last map shown in this channel.
+        command usage example:
+        - `!c`
+        - `!c ano`
+        - `!c @rieki`
+        """
+        last = self.last_maps.get(ctx.channel.id)
+        if last is None:
+            await ctx.send("no map was shown in this channel yet.")
+            return
+
+        map_server, shown = last
+
+        # NOTE: stay on the server the map was shown on, unless someone asks for another one
+        explicit_server = bool(args and SERVER_ARG.search(args))
+        server, args = await self.arg.parse_server(self, ctx, args)
+        if server is None:
+            return
+
+        if not explicit_server:
+            server = map_server
+
+        username, _ = await self.arg.parse_args(self, ctx, args)
+        if username is None:
+            return
+
+        beatmap = shown.beatmap
+
+        try:
+            board = await self.map_scores.get(server, beatmap, shown.mode)
+        except httpx.HTTPStatusError as e:
+            await ctx.send(f"failed to fetch scores for {beatmap.title} [{beatmap.version}] ({e.response.status_code}).")
+            return
+        except ApiError as e:
+            log(f"bad map scores response from {server}: {e}", Ansi.YELLOW)
+            await ctx.send("failed to fetch map scores.")
+            return
+        except Exception as er:
+            await ctx.send(f"failed to fetch map scores: {er}")
+            return
+
+        entry = board.find(username)
+        if entry is None:
+            await ctx.send(f"{username} has no score in the top {len(board.scores)} of {beatmap.artist} - {beatmap.title} [{beatmap.version}] on {server}.")
+            return
+
+        try:
+            embed = await self.embed_creator(server).create_single_score_embed(
+                entry.score,
+                entry.player_name,
+                entry.player_id,
+                board.calcs.get(entry.score.id)
+            )
+        except Exception as er:
+            await ctx.send(f"failed to calculate the score: {er}")
+            return
+
+        await ctx.send(f"#{board.rank(entry)} on the map for {entry.player_name}:", embed=embed)
+
 async def setup(bot: Bot) -> None:
     await bot.add_cog(Score(bot))
\ No newline at end of file
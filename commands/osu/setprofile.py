@@ -4,8 +4,8 @@ import discord
 from discord.ext import commands
 from typing import TYPE_CHECKING
 
-from objects import glob
 from utils.OsuMapping import Mode
+from utils.profileHelper import ProfileHelper
 
 if TYPE_CHECKING:
     from main import Bot
@@ -14,6 +14,7 @@ class SetProfile(commands.Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot: Bot = bot
         self.mode = Mode
+        self.profiles = ProfileHelper()
 
     @commands.command(
         name="setprofile",
@@ -26,20 +27,9 @@ class SetProfile(commands.Cog):
             return
 
         mode_int = self.mode.from_string(mode)
-        user_id = str(ctx.author.id)
-
-        result = await glob.db.fetch('select * from users where id = %s', [user_id])
-
-        if result:
-            await glob.db.execute(
-                'update users set name = %s, mode = %s where id = %s',
-                [username, mode_int, user_id]
-            )
-        else:
-            await glob.db.execute(
-                'insert into users (id, name, mode) values (%s, %s, %s)',
-                [user_id, username, mode_int]
-            )
+
+        # NOTE: also refreshes the cached profile parse_args reads
+        await self.profiles.set_profile(ctx.author.id, username, mode_int)
 
         await ctx.send(f"profile set for {username} in mode {mode}.")
 
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import discord
+import config
+import httpx
+import asyncio
+
+from discord.ext import commands
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from utils.logging import log, Ansi
+from utils.OsuMapping import Mode
+from utils.args import ArgParsing
+from usecases.tracker import PollScheduler, TrackedPlayer, TrackerStore, TrackKey, next_interval
+
+from commands.osu.OsuApi.models import ApiError, Score as ApiScore
+from commands.osu.score import ScoreEmbed
+
+from objects import glob
+
+if TYPE_CHECKING:
+    from main import Bot
+
+class Track(commands.Cog):
+    def __init__(self, bot: Bot) -> None:
+        """post new top plays of tracked players into the channels that track them"""
+        self.bot: Bot = bot
+        self.mode = Mode
+        self.arg = ArgParsing
+        self.store = TrackerStore()
+        self.players: Dict[TrackKey, TrackedPlayer] = {}
+        self.embed_creators: Dict[str, ScoreEmbed] = {}
+
+        self.min_interval: float = getattr(config, 'TrackerMinInterval', 30.0)
+        self.max_interval: float = getattr(config, 'TrackerMaxInterval', 30 * 60.0)
+        self.max_per_guild: int = getattr(config, 'TrackerMaxPerGuild', 200)
+
+        self.scheduler: PollScheduler[TrackKey] = PollScheduler(
+            self.poll,
+            concurrency=getattr(config, 'TrackerConcurrency', 4),
+            error_delay=self.min_interval * 4,
+        )
+
+        self.posted = 0
+        self.task = bot.loop.create_task(self._run())
+
+    def cog_unload(self) -> None:
+        self.task.cancel()
+
+    async def _run(self) -> None:
+        await self.bot.wait_until_ready()
+
+        # NOTE: poll right away, players added with !track shouldn't wait on the stored ones loading
+        loading = asyncio.create_task(self._load())
+        try:
+            await self.scheduler.run()
+        finally:
+            loading.cancel()
+
+    async def _load(self) -> None:
+        delay = self.min_interval
+        while True:
+            try:
+                players = await self.store.load()
+                break
+            except Exception as e:
+                log(f"failed to load tracked players, retrying in {delay:.0f}s: {e}", Ansi.RED)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_interval)
+
+        # XXX: !track may have added some of these while we were retrying, keep their channels too
+        for key, player in players.items():
+            current = self.players.get(key)
+            if current is not None:
+                player.subscriptions.update(current.subscriptions)
+
+            self.players[key] = player
+
+        # NOTE: spread the first round over the min interval so a restart doesn't burst the api
+        count = len(players)
+        for i, key in enumerate(players):
+            self.scheduler.add(key, delay=self.min_interval * i / max(count, 1))
+
+        log(f"tracking {count} players", Ansi.LCYAN)
+
+    def embed_creator(self, server: str) -> ScoreEmbed:
+        embed_creator = self.embed_creators.get(server)
+        if embed_creator is None:
+            embed_creator = self.embed_creators[server] = ScoreEmbed(server)
+
+        return embed_creator
+
+    async def poll(self, key: TrackKey) -> float:
+        """check a player's recent scores once, returns the delay until the next check."""
+        player = self.players.get(key)
+        if player is None:
+            return self.max_interval
+
+        response = await glob.servers.get(player.server).get_player_scores(
+            "recent", user_id=player.player_id, mode_arg=player.mode
+        )
+
+        # NOTE: score ids only go up, everything above the last one we saw is new
+        new_scores = sorted(
+            (score for score in response.scores
+             if player.last_score_id is None or score.id > player.last_score_id),
+            key=lambda score: score.id
+        )
+
+        if not new_scores:
+            return next_interval(player.last_played, False, self.min_interval, self.max_interval)
+
+        # XXX: first poll of a player, just remember where we are instead of posting their whole history
+        announce = player.last_score_id is not None
+
+        try:
+            for score in new_scores:
+                if announce and score.status == 2: # best on the map
+                    try:
+                        await self.announce(player, score)
+                    except Exception as e:
+                        # NOTE: skip the play instead of retrying it, a retry would re-post it wherever it went out
+                        log(f"failed to announce score {score.id} of {player.name}: {e}", Ansi.YELLOW)
+
+                player.last_score_id = score.id
+                player.last_played = score.play_time
+        finally:
+            # NOTE: whatever we got through is done, even if we were cancelled halfway
+            await self.store.save_progress(player)
+
+        return next_interval(player.last_played, True, self.min_interval, self.max_interval)
+
+    async def announce(self, player: TrackedPlayer, score: ApiScore) -> None:
+        """calculate a play once and send it to every channel subscribed to the player."""
+        channels: List[discord.abc.Messageable] = []
+        for channel_id, min_pp in player.subscriptions.items():
+            if score.pp < min_pp:
+                continue
+
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                if config.DEBUG:
+                    log(f"tracked channel {channel_id} is gone", Ansi.YELLOW)
+                continue
+
+            channels.append(channel)
+
+        if not channels:
+            return
+
+        embed = await self.embed_creator(player.server).create_single_score_embed(score, player.name, player.player_id)
+        content = f"new top play by **{player.name}**"
+
+        results = await asyncio.gather(
+            *(channel.send(content, embed=embed) for channel in channels),
+            return_exceptions=True
+        )
+
+        for channel, result in zip(channels, results):
+            if isinstance(result, Exception):
+                log(f"failed to post tracked score to {channel}: {result}", Ansi.YELLOW)
+            else:
+                self.posted += 1
+
+    async def _resolve(self, ctx: commands.Context, args: Optional[str]) -> Optional[TrackedPlayer]:
+        server, args = await self.arg.parse_server(self, ctx, args)
+        if server is None:
+            return None
+
+        username, mode = await self.arg.parse_args(self, ctx, args)
+        if username is None or mode is None:
+            return None
+
+        try:
+            response = await glob.servers.get(server).get_player_scores("recent", username=username, mode_arg=mode)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                await ctx.send(f"{username} not found in {server}")
+                return None
+            raise
+        except ApiError:
+            await ctx.send(f"failed to look up {username}.")
+            return None
+
+        player = self.players.get((server, response.player_id, mode))
+        if player is not None:
+            return player
+
+        # NOTE: start from their latest score, only plays after this get posted
+        latest = max(response.scores, key=lambda score: score.id, default=None)
+        return TrackedPlayer(
+            server=server,
+            player_id=response.player_id,
+            mode=mode,
+            name=response.player_name,
+            last_score_id=latest.id if latest else 0,
+            last_played=latest.play_time if latest else None,
+        )
+
+    @commands.command(name="track", description="post a player's new top plays in this channel")
+    @commands.has_permissions(manage_guild=True)
+    async def track(self, ctx: commands.Context, *, args: str = None) -> None:
+        """post a player's new top plays in this channel
+        usage: `!track <username> (+mode) (-s server)`
+        """
+        if ctx.guild is None:
+            return
+
+        player = await self._resolve(ctx, args)
+        if player is None:
+            return
+
+        if ctx.channel.id not in player.subscriptions and await self.store.guild_count(ctx.guild.id) >= self.max_per_guild:
+            await ctx.send(f"this server already tracks {self.max_per_guild} players.")
+            return
+
+        player.subscriptions[ctx.channel.id] = 0.0
+        await self.store.subscribe(player, ctx.guild.id, ctx.channel.id, 0.0)
+
+        if player.key not in self.players:
+            self.players[player.key] = player
+            self.scheduler.add(player.key, delay=self.min_interval)
+
+        await ctx.send(f"now tracking {player.name} ({self.mode.to_string(player.mode)}) on {player.server} in this channel.")
+
+    @commands.command(name="untrack", description="stop posting a player's top plays in this channel")
+    @commands.has_permissions(manage_guild=True)
+    async def untrack(self, ctx: commands.Context, *, args: str = None) -> None:
+        """stop posting a player's top plays in this channel
+        usage: `!untrack <username> (+mode) (-s server)`
+        """
+        if ctx.guild is None:
+            return
+
+        player = await self._resolve(ctx, args)
+        if player is None:
+            return
+
+        if player.subscriptions.pop(ctx.channel.id, None) is None:
+            await ctx.send(f"{player.name} isn't tracked in this channel.")
+            return
+
+        await self.store.unsubscribe(player, ctx.channel.id)
+
+        if not player.subscriptions:
+            self.players.pop(player.key, None)
+            self.scheduler.remove(player.key)
+
+        await ctx.send(f"stopped tracking {player.name} in this channel.")
+
+    @commands.command(name="tracking", description="list the players tracked in this server")
+    async def tracking(self, ctx: commands.Context) -> None:
+        """list the players tracked in this server"""
+        if ctx.guild is None:
+            return
+
+        channel_ids = {channel.id for channel in ctx.guild.channels}
+        lines = [
+            f"{player.name} ({self.mode.to_string(player.mode)}, {player.server}) in "
+            + ", ".join(f"<#{channel_id}>" for channel_id in player.subscriptions if channel_id in channel_ids)
+            for player in self.players.values()
+            if channel_ids.intersection(player.subscriptions)
+        ]
+
+        if not lines:
+            await ctx.send("nobody is tracked in this server.")
+            return
+
+        await ctx.send(embed=discord.Embed(
+            title=f"tracked players ({len(lines)})",
+            description="\n".join(lines[:50]) + (f"\n... and {len(lines) - 50} more" if len(lines) > 50 else ""),
+            color=0x2ECC71
+        ))
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Track(bot))
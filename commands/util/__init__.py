@@ -3,16 +3,19 @@ from typing import List
 available_commands: List[str] = [
     'ping',
     'info',
-    'eval'
+    'eval',
+    'queries'
 ]
 
 from .ping import Ping
 from .info import Info
 from .eval import Eval
+from .queries import Queries
 
 __all__ = [
     'Ping',
     'Info',
     'Eval',
+    'Queries',
     'available_commands'
 ]
\ No newline at end of file
@@ -9,9 +9,12 @@ from typing import TYPE_CHECKING
 
 import config
 import random
-import os
 import sys
 
+from objects import glob
+from commands.osu.OsuApi.api import response_cache, request_coalescer, rate_limiters, circuit_breakers, api_stats
+from utils.repository import write_behind
+
 if TYPE_CHECKING:
     from main import Bot
 
@@ -47,11 +50,50 @@ class Info(commands.Cog):
         for i, usage in enumerate(cpu_usage, start=1):
             info += f"CPU core {i}: {usage}%\n"
 
-        data_path = ".data"
-
         info += (
             f"\nservers: {len(ctx.bot.guilds)}\n"
-            f"beatmaps cached: {len([file for file in os.listdir(data_path) if os.path.isfile(os.path.join(data_path, file))])}\n"
+            f"beatmaps cached: {len(glob.beatmaps)} ({glob.beatmaps.total_bytes / 1024 ** 2:.1f} MB)\n"
+            f"pp calculations: {glob.calculator.completed} done, {glob.calculator.pending} pending, {glob.calculator.timeouts} timed out\n"
+            f"parsed beatmap cache: {glob.calculator.cache_hits} hits / {glob.calculator.cache_misses} misses\n"
+        )
+
+        if glob.calculator.results is not None:
+            results = glob.calculator.results
+            info += f"pp result cache: {results.memory_hits} memory / {results.disk_hits} disk hits, {results.misses} misses\n"
+
+        info += (
+            f"api cache: {len(response_cache)} responses ({response_cache.hit_rate:.0%} hit rate, {response_cache.stale_hits} served stale)\n"
+            f"api requests: {request_coalescer.requests} sent, {request_coalescer.coalesced} coalesced, "
+            f"{api_stats.failures} failed, {api_stats.retries} retried\n"
+        )
+
+        for server, breaker in circuit_breakers.items():
+            limiter = rate_limiters[server]
+            info += (
+                f"{server}: circuit {breaker.state} (opened {breaker.opens}x, {breaker.rejected} rejected), "
+                f"rate limited {limiter.waits}x ({limiter.wait_time:.1f}s)\n"
+            )
+
+        tracker = self.bot.get_cog("Track")
+        if tracker is not None:
+            info += (
+                f"tracker: {len(tracker.scheduler)} players, {tracker.scheduler.polls} polls "
+                f"({tracker.scheduler.errors} failed), {tracker.posted} plays posted\n"
+            )
+
+        if glob.db:
+            info += (
+                f"db pool: {glob.db.in_use} in use, {glob.db.idle} idle (max {glob.db.max_size}), "
+                f"{glob.db.wait_time / max(glob.db.acquires, 1) * 1000:.1f}ms avg wait, "
+                f"{glob.db.retried} retried after {glob.db.connection_errors} dropped connections\n"
+            )
+
+        info += (
+            f"queued db writes: {write_behind.pending_count} pending, {write_behind.rows} rows in "
+            f"{write_behind.statements} statements ({write_behind.failures} failed flushes)\n"
+        )
+
+        info += (
             f"bot latency: {round(self.bot.latency * 1000, 2)}ms\n"
             f"discord.py version: [{discord.__version__}](https://github.com/Rapptz/discord.py)\n"
             f"python version: [{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}](https://www.python.org/)\n"
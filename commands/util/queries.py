@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import discord
+
+import random
+
+from discord.ext import commands
+from typing import TYPE_CHECKING
+
+import config
+
+from utils.database import query_stats
+
+if TYPE_CHECKING:
+    from main import Bot
+
+class Queries(commands.Cog):
+    def __init__(self, bot: Bot) -> None:
+        self.bot: Bot = bot
+
+    @commands.command(
+        name="queries",
+        aliases=['sqlstats'],
+        description="the sql statements that took the most time since startup",
+    )
+    async def queries(self, ctx: commands.Context, arg: str = None) -> None:
+        """the sql statements that took the most time since startup
+        usage: `!queries (count|reset)`
+        """
+        if ctx.author.id != config.OwnerID:
+            await ctx.send(random.choice(config.ownercheckmotd))
+            return
+
+        if arg == "reset":
+            query_stats.reset()
+            await ctx.send("query stats reset.")
+            return
+
+        limit = int(arg) if arg and arg.isdigit() else 10
+        top = query_stats.top(min(limit, 25))
+        if not top:
+            await ctx.send("no queries recorded yet.")
+            return
+
+        total = sum(stats.total for stats in query_stats.statements.values())
+        lines = []
+        for statement, stats in top:
+            if len(statement) > 180:
+                statement = statement[:177] + "..."
+
+            lines.append(
+                f"**{stats.total / 1000:.2f}s** ({stats.total / max(total, 1e-9):.0%}) ▸ {stats.calls:,} calls "
+                f"▸ avg {stats.total / stats.calls:.1f}ms ▸ p95 {stats.percentile(0.95):.0f}ms ▸ max {stats.max:.0f}ms"
+                + (f" ▸ {stats.errors} failed" if stats.errors else "")
+                + f"\n```sql\n{statement}\n```"
+            )
+
+        # XXX: embed descriptions cap at 4096 characters, drop the cheapest statements first
+        description = ""
+        for line in lines:
+            if len(description) + len(line) > 4000:
+                break
+            description += line
+
+        embed = discord.Embed(title="top statements by total time", description=description, color=0x424549)
+        slow = f"{query_stats.slow} slow (over {query_stats.slow_ms:.0f}ms)" if query_stats.slow_ms is not None else "slow log off"
+        embed.set_footer(text=f"{len(query_stats.statements)} statements | {slow}")
+
+        await ctx.send(embed=embed)
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Queries(bot))
@@ -25,6 +25,7 @@ DROP TABLE IF EXISTS `guilds`;
 CREATE TABLE `guilds` (
   `guild_id` bigint NOT NULL,
   `prefix` varchar(3) NOT NULL,
+  `server` varchar(64) DEFAULT NULL, -- NOTE: existing databases: migrations/0001_guilds_server.sql
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   PRIMARY KEY (`guild_id`),
@@ -48,6 +49,67 @@ CREATE TABLE `lastfm` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+-- 
+-- Table structure for table `leaderboard_stats`
+--
+
+DROP TABLE IF EXISTS `leaderboard_stats`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+!/50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `leaderboard_stats` (
+  `server` varchar(64) NOT NULL,
+  `safe_name` varchar(32) NOT NULL,
+  `mode` tinyint NOT NULL,
+  `player_id` int NOT NULL,
+  `name` varchar(32) NOT NULL,
+  `pp` int NOT NULL DEFAULT '0',
+  `acc` float NOT NULL DEFAULT '0',
+  `rank` int NOT NULL DEFAULT '0',
+  `plays` int NOT NULL DEFAULT '0',
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`server`,`safe_name`,`mode`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+-- 
+-- Table structure for table `tracked_players`
+--
+
+DROP TABLE IF EXISTS `tracked_players`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+!/50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `tracked_players` (
+  `server` varchar(64) NOT NULL,
+  `player_id` int NOT NULL,
+  `mode` tinyint NOT NULL,
+  `name` varchar(32) NOT NULL,
+  `last_score_id` bigint DEFAULT NULL,
+  `last_played` datetime DEFAULT NULL,
+  PRIMARY KEY (`server`,`player_id`,`mode`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+-- 
+-- Table structure for table `tracking`
+--
+
+DROP TABLE IF EXISTS `tracking`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+!/50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `tracking` (
+  `channel_id` bigint NOT NULL,
+  `guild_id` bigint NOT NULL,
+  `server` varchar(64) NOT NULL,
+  `player_id` int NOT NULL,
+  `mode` tinyint NOT NULL,
+  `min_pp` float NOT NULL DEFAULT '0',
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`channel_id`,`server`,`player_id`,`mode`),
+  KEY `tracking_guild` (`guild_id`),
+  KEY `tracking_player` (`server`,`player_id`,`mode`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 -- 
 -- Table structure for table `users`
 --
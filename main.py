@@ -2,22 +2,31 @@
 from __future__ import annotations
 
 import os
+import asyncio
 import config
 
 import discord
 from discord.ext import commands, tasks
 import os
 from datetime import datetime
+from typing import Optional
 
 from utils.logging import log
 from utils.logging import Ansi
-from cmyui.mysql import AsyncSQLPool
+from utils.database import Database
 
 from objects import glob
 
 from commands import CATEGORIES
 from utils.help import Help
 from commands.guilds.prefix import get_prefix
+from utils.prefixHelper import guild_cache
+from utils.repository import write_behind
+from commands.osu.OsuApi.servers import ServerRegistry
+from utils.http import create_http_registry
+from usecases.calculation import create_calculation_service
+from usecases.osutools import create_osu_tools_pool
+from usecases.beatmaps import create_beatmap_store, create_beatmap_downloader
 
 class Bot(commands.Bot):
     def __init__(self) -> None:
@@ -32,16 +41,64 @@ class Bot(commands.Bot):
                          intents=intents,
                          activity=discord.CustomActivity(name=self.config.Status),
                          help_command=Help())
+
+        self.warmup_task: Optional[asyncio.Task] = None
         
         self.startup_time = datetime.now()
     
     async def setup_hook(self) -> None: 
         log("starting bot setup...", Ansi.CYAN)
         
+        glob.http = create_http_registry(getattr(config, 'HttpPools', {}))
+        glob.servers = ServerRegistry(config.Bancho, getattr(config, 'BanchoServers', []), glob.http)
+
+        glob.beatmaps = create_beatmap_store()
+        await asyncio.to_thread(glob.beatmaps.load_index)
+        glob.downloader = create_beatmap_downloader(glob.beatmaps, glob.http.get("osu"))
+
+        glob.calculator = create_calculation_service()
+        glob.calculator.start()
+
+        glob.osu_tools = create_osu_tools_pool()
+        if glob.osu_tools:
+            try:
+                await glob.osu_tools.start()
+            except Exception as e:
+                log(f"failed to start osu-tools workers: {e}", Ansi.RED)
+                glob.osu_tools = None
+
         await self.load_extensions()
         await self.initialize_db()
         self.check_db_connection.start()
 
+        # NOTE: flushes queued prefix/server/profile writes, a failed flush keeps them for the next one
+        write_behind.start()
+
+        # NOTE: dns + tls handshakes now instead of on someone's first command
+        self.warmup_task = asyncio.create_task(glob.http.warmup())
+        self.warmup_task.add_done_callback(self._warmup_done)
+
+    @staticmethod
+    def _warmup_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log(f"http warmup failed: {task.exception()}", Ansi.YELLOW)
+
+    async def close(self) -> None:
+        log("shutting down...", Ansi.CYAN)
+        if glob.db:
+            await write_behind.close()
+            await glob.db.close()
+        glob.calculator.close()
+        await glob.servers.close()
+        if self.warmup_task is not None and not self.warmup_task.done():
+            # NOTE: don't leave it talking to clients we're about to close
+            self.warmup_task.cancel()
+            await asyncio.gather(self.warmup_task, return_exceptions=True)
+        await glob.http.close()
+        if glob.osu_tools:
+            await glob.osu_tools.close()
+        await super().close()
+
     async def on_ready(self):
         log(f"logged in as {self.user} (ID: {self.user.id})", Ansi.CYAN)
         await self.tree.sync()
@@ -115,18 +172,34 @@ class Bot(commands.Bot):
         await self.process_commands(message)
 
     async def initialize_db(self) -> None:
+        old = getattr(glob, 'db', None)
+        glob.db = Database(retries=getattr(config, 'DatabaseRetries', 1))
+
+        if old is not None:
+            # NOTE: a reconnect, don't leave the old pool's connections open
+            try:
+                await old.close()
+            except Exception:
+                pass
+
         try:
-            glob.db = AsyncSQLPool()
             await glob.db.connect(glob.config.db_config)
             log('connected to MySQL!', Ansi.LGREEN)
         except Exception as e:
             log(f"database connection failed: {str(e)}", Ansi.RED)
+            return
+
+        try:
+            await guild_cache.load()
+        except Exception as e:
+            # NOTE: prefix/server lookups fall back to querying per guild until this works
+            log(f"failed to load guild settings: {str(e)}", Ansi.RED)
 
     @tasks.loop(minutes=3)
     async def check_db_connection(self) -> None:
         """db connection check"""
-        # XXX: per sometime the db just throws ConnectionResetError??
-        # XXX: idk anymore i just want to sleep
+        # NOTE: dropped connections are retried by the pool itself (utils/database.py),
+        #       this only rebuilds it when mysql was unreachable for longer than a retry
         if glob.db:
             try:
                 await glob.db.fetch('select 1') # just try to fetch somethign
@@ -0,0 +1,5 @@
+-- per-guild default osu! server (!setserver), for databases created from an older kselon.sql
+-- run once: mysql kselon < migrations/0001_guilds_server.sql
+
+ALTER TABLE `guilds`
+  ADD COLUMN `server` varchar(64) DEFAULT NULL AFTER `prefix`;
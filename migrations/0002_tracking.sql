@@ -0,0 +1,25 @@
+-- tracked players and the channels that track them (!track), for databases created from an older kselon.sql
+-- run once: mysql kselon < migrations/0002_tracking.sql
+
+CREATE TABLE IF NOT EXISTS `tracked_players` (
+  `server` varchar(64) NOT NULL,
+  `player_id` int NOT NULL,
+  `mode` tinyint NOT NULL,
+  `name` varchar(32) NOT NULL,
+  `last_score_id` bigint DEFAULT NULL,
+  `last_played` datetime DEFAULT NULL,
+  PRIMARY KEY (`server`,`player_id`,`mode`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `tracking` (
+  `channel_id` bigint NOT NULL,
+  `guild_id` bigint NOT NULL,
+  `server` varchar(64) NOT NULL,
+  `player_id` int NOT NULL,
+  `mode` tinyint NOT NULL,
+  `min_pp` float NOT NULL DEFAULT '0',
+  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`channel_id`,`server`,`player_id`,`mode`),
+  KEY `tracking_guild` (`guild_id`),
+  KEY `tracking_player` (`server`,`player_id`,`mode`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,16 @@
+-- cached player stats for guild leaderboards (!lb), for databases created from an older kselon.sql
+-- run once: mysql kselon < migrations/0003_leaderboard_stats.sql
+
+CREATE TABLE IF NOT EXISTS `leaderboard_stats` (
+  `server` varchar(64) NOT NULL,
+  `safe_name` varchar(32) NOT NULL,
+  `mode` tinyint NOT NULL,
+  `player_id` int NOT NULL,
+  `name` varchar(32) NOT NULL,
+  `pp` int NOT NULL DEFAULT '0',
+  `acc` float NOT NULL DEFAULT '0',
+  `rank` int NOT NULL DEFAULT '0',
+  `plays` int NOT NULL DEFAULT '0',
+  `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`server`,`safe_name`,`mode`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
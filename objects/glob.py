@@ -1,19 +1,28 @@
 # -*- coding: utf-8 -*-
 
-__all__ = ('db', 'http', 'version', 'cache')
+__all__ = ('db', 'http', 'version', 'calculator', 'osu_tools', 'beatmaps', 'downloader', 'servers', 'cache')
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 import config  # imported for indirect use
 
 if TYPE_CHECKING:
-    from aiohttp import ClientSession
-    from cmyui.mysql import AsyncSQLPool
+    from utils.database import Database
     from cmyui.version import Version
+    from usecases.calculation import CalculationService
+    from usecases.osutools import OsuToolsPool
+    from usecases.beatmaps import BeatmapStore, BeatmapDownloader
+    from commands.osu.OsuApi.servers import ServerRegistry
+    from utils.http import HttpClientRegistry
 
-db: 'AsyncSQLPool'
-http: 'ClientSession'
+db: 'Database'
+http: 'HttpClientRegistry'
 version: 'Version'
+calculator: 'CalculationService'
+osu_tools: Optional['OsuToolsPool'] = None
+beatmaps: 'BeatmapStore'
+downloader: 'BeatmapDownloader'
+servers: 'ServerRegistry'
 
 cache = {
     'bcrypt': {}
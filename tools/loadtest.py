@@ -0,0 +1,221 @@
+"""fire osu commands through the real cogs against tools/mock_bancho.py and report latency.
+
+usage:
+    python -m tools.loadtest top -n 200 -c 20 --latency 0.05 --error-rate 0.01
+    python -m tools.loadtest rs pf top --recordings tools/recordings --players 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import math
+import statistics
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from objects import glob
+from commands.osu.OsuApi import api
+from commands.osu.OsuApi.servers import ServerRegistry
+from commands.osu.score import Score
+from commands.osu.profile import Profile
+from usecases.beatmaps import BeatmapStore, create_beatmap_downloader
+from usecases.calculation import CalculationService
+from usecases.pp_cache import ResultCache, calculator_version
+from utils.http import create_http_registry
+
+from tools.mock_bancho import MockBancho, Recordings
+
+MOCK_SERVER = "mock.local"
+
+# --- just enough of discord.py for the cogs ---
+class FakeUser:
+    def __init__(self, user_id: int) -> None:
+        self.id = user_id
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, content: Optional[str] = None, embed: Any = None) -> None:
+        self.id = next(self._ids)
+        self.content = content
+        self.embed = embed
+        self.mentions: List[FakeUser] = []
+
+    async def edit(self, **kwargs: Any) -> None:
+        self.embed = kwargs.get("embed", self.embed)
+
+class FakeChannel:
+    _ids = itertools.count(1)
+
+    def __init__(self) -> None:
+        self.id = next(self._ids)
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.user = FakeUser(0)
+
+class FakeContext:
+    def __init__(self, bot: FakeBot) -> None:
+        self.bot = bot
+        self.author = FakeUser(1)
+        self.guild = None # NOTE: no guild, so no database lookups for the server
+        # NOTE: one per invocation, !c remembers the last map per channel
+        self.channel = FakeChannel()
+        self.message = FakeMessage()
+        self.replies: List[FakeMessage] = []
+
+    async def send(self, content: Optional[str] = None, embed: Any = None, **kwargs: Any) -> FakeMessage:
+        message = FakeMessage(content, embed)
+        self.replies.append(message)
+        return message
+
+# --- the run ---
+def percentile(samples: List[float], pct: float) -> float:
+    """nearest-rank percentile of sorted samples."""
+    if not samples:
+        return 0.0
+
+    index = max(0, min(len(samples) - 1, math.ceil(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+async def setup(mock: MockBancho, beatmap_dir: str, workers: int, result_cache: bool, api_cache: bool) -> None:
+    """the part of Bot.setup_hook the osu commands need, pointed at the mock."""
+    glob.http = create_http_registry({}, transport=mock.transport())
+    glob.servers = ServerRegistry(MOCK_SERVER, [], glob.http)
+
+    glob.beatmaps = BeatmapStore(Path(beatmap_dir), max_bytes=1024 ** 3)
+    glob.beatmaps.load_index()
+    glob.downloader = create_beatmap_downloader(glob.beatmaps, glob.http.get("osu"))
+
+    results = ResultCache(None, 10_000, calculator_version()) if result_cache else None
+    glob.calculator = CalculationService(workers=workers, max_queue=workers * 16, timeout=30.0,
+                                         recycle_after=10_000, results=results)
+    glob.calculator.start()
+    glob.osu_tools = None
+
+    if not api_cache:
+        api.response_cache.max_entries = 0
+
+async def teardown() -> None:
+    glob.calculator.close()
+    await glob.servers.close()
+    await glob.http.close()
+
+async def invoke(cogs: Dict[str, Any], bot: FakeBot, command: str, player: str) -> Optional[str]:
+    """run one command, returns None on success or what the bot replied instead of an embed."""
+    ctx = FakeContext(bot)
+    args = f"{player} -s {MOCK_SERVER}"
+
+    if command == "rs":
+        await Score.recent.callback(cogs["score"], ctx, args=args)
+    elif command == "top":
+        await Score.top.callback(cogs["score"], ctx, args=args)
+    else:
+        await Profile.profile.callback(cogs["profile"], ctx, args=args)
+
+    if not ctx.replies or ctx.replies[-1].embed is None:
+        return ctx.replies[-1].content if ctx.replies else "no reply"
+
+    return None
+
+async def run(args: argparse.Namespace) -> None:
+    recordings = Recordings.load(args.recordings) if args.recordings else Recordings.synthetic()
+    mock = MockBancho(recordings, args.latency, args.jitter, args.error_rate, args.timeout_rate, args.seed)
+
+    with tempfile.TemporaryDirectory() as beatmap_dir:
+        await setup(mock, beatmap_dir, args.workers, args.result_cache, args.api_cache)
+
+        bot = FakeBot()
+        cogs = {"score": Score(bot), "profile": Profile(bot)}
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies: Dict[str, List[float]] = {command: [] for command in args.commands}
+        failures: Dict[str, int] = {}
+
+        async def one(n: int) -> None:
+            command = args.commands[n % len(args.commands)]
+            player = f"player{n % args.players}"
+
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    failure = await invoke(cogs, bot, command, player)
+                except Exception as e:
+                    failure = f"{type(e).__name__}: {e}"
+                elapsed = time.perf_counter() - start
+
+            latencies[command].append(elapsed)
+            if failure is not None:
+                failures[failure] = failures.get(failure, 0) + 1
+
+        try:
+            if args.warmup:
+                await asyncio.gather(*(one(n) for n in range(args.warmup)))
+                for samples in latencies.values():
+                    samples.clear()
+                failures.clear()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(n) for n in range(args.requests)))
+            wall = time.perf_counter() - started
+        finally:
+            cogs["score"].cog_unload()
+            await teardown()
+
+    print(f"{args.requests} commands, concurrency {args.concurrency}, {wall:.2f}s wall, "
+          f"{args.requests / wall:.1f} commands/s")
+    print(f"mock: {mock.requests} requests, {mock.errors} injected errors, {mock.timeouts} injected timeouts")
+    print(f"calc: {glob.calculator.completed} jobs, {glob.calculator.rejected} rejected, {glob.calculator.timeouts} timeouts")
+    print()
+    print(f"{'command':<8} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+
+    for command, samples in latencies.items():
+        samples.sort()
+        if not samples:
+            continue
+
+        print(
+            f"{command:<8} {len(samples):>6} "
+            f"{statistics.mean(samples) * 1000:>7.1f}ms "
+            f"{percentile(samples, 50) * 1000:>7.1f}ms "
+            f"{percentile(samples, 95) * 1000:>7.1f}ms "
+            f"{percentile(samples, 99) * 1000:>7.1f}ms "
+            f"{samples[-1] * 1000:>7.1f}ms"
+        )
+
+    if failures:
+        print()
+        print("failures:")
+        for failure, count in sorted(failures.items(), key=lambda item: -item[1]):
+            print(f"  {count:>5}x {failure}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="load test the osu commands against a mock bancho api")
+    parser.add_argument("commands", nargs="+", choices=("rs", "top", "pf"),
+                        help="commands to run, interleaved round robin")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="commands to run")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="commands in flight at once")
+    parser.add_argument("--players", type=int, default=10, help="distinct usernames to spread over")
+    parser.add_argument("--warmup", type=int, default=0, help="commands to run (and not measure) first")
+    parser.add_argument("--recordings", type=Path, default=None,
+                        help="directory from `tools.mock_bancho record`, synthetic responses otherwise")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every mock response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, uniformly")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of responses that are a 503")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests that time out")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=2, help="calculation worker processes")
+    parser.add_argument("--result-cache", action="store_true", help="enable the in-memory pp result cache")
+    parser.add_argument("--no-api-cache", dest="api_cache", action="store_false",
+                        help="bypass the api response cache")
+
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""local stand-in for a bancho.py api and osu.ppy.sh, for benchmarking without a live server.
+
+usage:
+    python -m tools.mock_bancho record --server refx.online --player ano --out tools/recordings
+    (then point tools/loadtest.py at it with --recordings tools/recordings)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import random
+import httpx
+import orjson
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+class Recordings:
+    """recorded api responses (keyed by endpoint and scope) and .osu files (keyed by beatmap id)."""
+
+    def __init__(self, responses: Dict[str, bytes], beatmaps: Dict[int, bytes]) -> None:
+        self.responses = responses
+        self.beatmaps = beatmaps
+
+    @staticmethod
+    def key(endpoint: str, scope: Optional[str]) -> str:
+        return f"{endpoint}.{scope}" if scope else endpoint
+
+    @classmethod
+    def load(cls, root: Path) -> Recordings:
+        responses = {path.stem: path.read_bytes() for path in root.glob("*.json")}
+        beatmaps = {int(path.stem): path.read_bytes() for path in (root / "osu").glob("*.osu")}
+
+        if not responses:
+            raise FileNotFoundError(f"no recorded responses in {root}")
+
+        return cls(responses, beatmaps)
+
+    def save(self, root: Path) -> None:
+        (root / "osu").mkdir(parents=True, exist_ok=True)
+
+        for key, content in self.responses.items():
+            (root / f"{key}.json").write_bytes(content)
+
+        for beatmap_id, content in self.beatmaps.items():
+            (root / "osu" / f"{beatmap_id}.osu").write_bytes(content)
+
+    @classmethod
+    def synthetic(cls, maps: int = 10, scores: int = 100, objects: int = 500) -> Recordings:
+        """made up but internally consistent responses, for when there's nothing recorded."""
+        rng = random.Random(727)
+        beatmaps: Dict[int, bytes] = {}
+        beatmap_dicts: List[dict] = []
+
+        for i in range(maps):
+            beatmap_id = 1_000_000 + i
+            content = _synthetic_osu(beatmap_id, i, objects, rng)
+            beatmaps[beatmap_id] = content
+
+            beatmap_dicts.append({
+                "id": beatmap_id,
+                "set_id": 500_000 + i,
+                "md5": hashlib.md5(content).hexdigest(),
+                "artist": "kselon",
+                "title": "mock",
+                "version": f"map {i}",
+                "max_combo": objects,
+            })
+
+        def score(n: int) -> dict:
+            nmiss = rng.choice((0, 0, 0, 1, 3))
+            n100 = rng.randint(0, objects // 20)
+            return {
+                "id": 10_000_000 + n,
+                "score": rng.randint(1_000_000, 50_000_000),
+                "pp": round(rng.uniform(100, 700), 3),
+                "acc": round(100 - n100 * 100 / objects / 3 - nmiss * 100 / objects, 3),
+                "max_combo": objects if nmiss == 0 else rng.randint(objects // 4, objects - 1),
+                "mods": rng.choice((0, 8, 16, 64, 72)),
+                "mods_readable": rng.choice(("NM", "HD", "HR", "DT", "HDDT")),
+                "n300": objects - n100 - nmiss,
+                "n100": n100,
+                "n50": 0,
+                "nmiss": nmiss,
+                "grade": "S" if nmiss == 0 else "A",
+                "mode": 0,
+                "play_time": "2024-06-01T12:00:00",
+                "beatmap": beatmap_dicts[n % maps],
+            }
+
+        player = {"id": 3, "name": "mock", "clan": None}
+        stats = {
+            str(mode): {
+                "pp": 10_000, "acc": 98.5, "rank": 1, "country_rank": 1, "plays": 10_000,
+                "playtime": 3_600_000, "xh_count": 10, "x_count": 20, "sh_count": 30,
+                "s_count": 40, "a_count": 50, "xp": 0,
+            }
+            for mode in range(9)
+        }
+
+        responses = {
+            "get_player_scores.best": {"status": "success", "scores": [score(n) for n in range(scores)], "player": player},
+            "get_player_scores.recent": {"status": "success", "scores": [score(scores)], "player": player},
+            "get_player_info.all": {"status": "success", "player": {
+                "info": {
+                    "id": 3, "name": "mock", "country": "jp",
+                    "creation_time": 1_600_000_000, "latest_activity": 1_700_000_000,
+                },
+                "stats": stats,
+            }},
+            "get_map_info": {"status": "success", "map": beatmap_dicts[0]},
+        }
+
+        return cls({key: orjson.dumps(value) for key, value in responses.items()}, beatmaps)
+
+def _synthetic_osu(beatmap_id: int, index: int, objects: int, rng: random.Random) -> bytes:
+    hit_objects = "\n".join(
+        f"{rng.randint(0, 512)},{rng.randint(0, 384)},{1000 + n * 150},{5 if n == 0 else 1},0,0:0:0:0:"
+        for n in range(objects)
+    )
+
+    return (
+        "osu file format v14\n\n"
+        "[General]\nAudioFilename: audio.mp3\nMode: 0\n\n"
+        f"[Metadata]\nTitle:mock\nArtist:kselon\nCreator:kselon\nVersion:map {index}\n"
+        f"BeatmapID:{beatmap_id}\nBeatmapSetID:{500_000 + index}\n\n"
+        f"[Difficulty]\nHPDrainRate:5\nCircleSize:4\nOverallDifficulty:{7 + index % 3}\n"
+        f"ApproachRate:{8 + index % 3}\nSliderMultiplier:1.4\nSliderTickRate:1\n\n"
+        "[TimingPoints]\n0,300,4,2,0,100,1,0\n\n"
+        f"[HitObjects]\n{hit_objects}\n"
+    ).encode()
+
+class MockBancho:
+    """httpx transport answering like api.<server>/v1 and osu.ppy.sh/osu, with injected latency and errors."""
+
+    def __init__(self, recordings: Recordings, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, timeout_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self._rng = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+
+        # NOTE: warmup requests from the http registry, no need to make them slow
+        if request.method == "HEAD":
+            return httpx.Response(200)
+
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self._rng.random()
+        if roll < self.timeout_rate:
+            self.timeouts += 1
+            raise httpx.ReadTimeout("injected timeout", request=request)
+
+        if roll < self.timeout_rate + self.error_rate:
+            self.errors += 1
+            return httpx.Response(503, json={"status": "injected error"})
+
+        if request.url.host == "osu.ppy.sh":
+            return self._beatmap(request)
+
+        return self._api(request)
+
+    def _beatmap(self, request: httpx.Request) -> httpx.Response:
+        # /osu/<id>
+        try:
+            content = self.recordings.beatmaps.get(int(request.url.path.rsplit("/", 1)[-1]))
+        except ValueError:
+            content = None
+
+        if content is None:
+            return httpx.Response(404)
+
+        return httpx.Response(200, content=content)
+
+    def _api(self, request: httpx.Request) -> httpx.Response:
+        # /v1/<endpoint>?scope=...
+        endpoint = request.url.path.rsplit("/", 1)[-1]
+        key = Recordings.key(endpoint, request.url.params.get("scope"))
+
+        content = self.recordings.responses.get(key)
+        if content is None:
+            return httpx.Response(404, json={"status": "not recorded"})
+
+        return httpx.Response(200, content=content, headers={"content-type": "application/json"})
+
+async def record(server: str, player: str, mode: int, root: Path) -> None:
+    """record the responses of a live server for one player, plus every .osu file they reference."""
+    responses: Dict[str, bytes] = {}
+    beatmaps: Dict[int, bytes] = {}
+
+    async with httpx.AsyncClient(base_url=f"https://api.{server}/v1/", timeout=30) as api, \
+               httpx.AsyncClient(base_url="https://osu.ppy.sh", timeout=30, follow_redirects=True) as osu:
+        for endpoint, scope in (("get_player_scores", "best"), ("get_player_scores", "recent"), ("get_player_info", "all")):
+            params = {"name": player, "scope": scope}
+            if endpoint == "get_player_scores":
+                params["mode"] = mode
+                params["limit"] = 100
+
+            response = await api.get(endpoint, params=params)
+            response.raise_for_status()
+            responses[Recordings.key(endpoint, scope)] = response.content
+
+        maps = {
+            score["beatmap"]["id"]: score["beatmap"]
+            for key in ("get_player_scores.best", "get_player_scores.recent")
+            for score in orjson.loads(responses[key])["scores"]
+        }
+
+        if maps:
+            response = await api.get("get_map_info", params={"id": next(iter(maps))})
+            response.raise_for_status()
+            responses["get_map_info"] = response.content
+
+        for beatmap_id, beatmap in maps.items():
+            response = await osu.get(f"/osu/{beatmap_id}")
+
+            # XXX: the map got updated since the score was set, the md5 check would reject it anyway
+            if response.status_code != 200 or hashlib.md5(response.content).hexdigest() != beatmap["md5"]:
+                print(f"skipping outdated beatmap {beatmap_id}")
+                continue
+
+            beatmaps[beatmap_id] = response.content
+
+    Recordings(responses, beatmaps).save(root)
+    print(f"recorded {len(responses)} responses and {len(beatmaps)} beatmaps into {root}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="record responses for the mock bancho api")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="record a live server")
+    record_parser.add_argument("--server", required=True)
+    record_parser.add_argument("--player", required=True)
+    record_parser.add_argument("--mode", type=int, default=0)
+    record_parser.add_argument("--out", type=Path, default=Path("tools/recordings"))
+
+    synthetic_parser = commands.add_parser("synthetic", help="write made up recordings")
+    synthetic_parser.add_argument("--maps", type=int, default=10)
+    synthetic_parser.add_argument("--scores", type=int, default=100)
+    synthetic_parser.add_argument("--out", type=Path, default=Path("tools/recordings"))
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.server, args.player, args.mode, args.out))
+    else:
+        Recordings.synthetic(args.maps, args.scores).save(args.out)
+        print(f"wrote synthetic recordings into {args.out}")
+
+if __name__ == "__main__":
+    main()
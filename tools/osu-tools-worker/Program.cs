@@ -0,0 +1,99 @@
+// json-lines host around osu-tools' PerformanceCalculator, so the bot can keep a few warm
+// calculators around instead of paying dotnet startup + ruleset loading for every score.
+//
+// protocol (see usecases/osutools.py):
+//   -> {"id": 1, "args": ["simulate", "osu", "/path/map.osu", "-m", "HD", "--json"]}
+//   <- {"id": 1, "ok": true, "output": { ...PerformanceCalculator --json output... }}
+//   <- {"id": 1, "ok": false, "error": "something broke"}
+//   -> {"id": 2, "ping": true}
+//   <- {"id": 2, "ok": true}
+//
+// requests are handled one at a time, PerformanceCalculator writes its result to Console.Out
+// which is process wide. the bot runs several of these for parallelism.
+
+using System;
+using System.IO;
+using System.Text;
+using System.Text.Json;
+using System.Text.Json.Nodes;
+using McMaster.Extensions.CommandLineUtils;
+
+namespace PerformanceCalculatorWorker
+{
+    public static class Program
+    {
+        public static int Main()
+        {
+            // NOTE: keep the real stdout for responses, everything PerformanceCalculator prints goes to a buffer
+            var responses = new StreamWriter(Console.OpenStandardOutput(), new UTF8Encoding(false)) { AutoFlush = true };
+            var requests = new StreamReader(Console.OpenStandardInput(), Encoding.UTF8);
+
+            Console.SetOut(TextWriter.Null);
+            Console.SetError(TextWriter.Null);
+
+            string? line;
+            while ((line = requests.ReadLine()) != null)
+            {
+                if (string.IsNullOrWhiteSpace(line))
+                    continue;
+
+                JsonNode? id = null;
+                JsonObject response;
+
+                try
+                {
+                    var request = JsonNode.Parse(line)!.AsObject();
+                    id = request["id"]?.DeepClone();
+
+                    response = request["ping"]?.GetValue<bool>() == true
+                        ? new JsonObject { ["ok"] = true }
+                        : Simulate(request["args"]!.AsArray());
+                }
+                catch (Exception e)
+                {
+                    response = new JsonObject { ["ok"] = false, ["error"] = e.Message };
+                }
+
+                response["id"] = id;
+                responses.WriteLine(response.ToJsonString());
+            }
+
+            return 0;
+        }
+
+        private static JsonObject Simulate(JsonArray args)
+        {
+            var argv = new string[args.Count];
+            for (int i = 0; i < args.Count; i++)
+                argv[i] = args[i]!.GetValue<string>();
+
+            var output = new StringWriter();
+            var error = new StringWriter();
+            Console.SetOut(output);
+            Console.SetError(error);
+
+            int exitCode;
+            try
+            {
+                // XXX: same entry point PerformanceCalculator's Main uses, minus the process startup
+                exitCode = CommandLineApplication.Execute<PerformanceCalculator.Program>(argv);
+            }
+            finally
+            {
+                Console.SetOut(TextWriter.Null);
+                Console.SetError(TextWriter.Null);
+            }
+
+            if (exitCode != 0)
+                return new JsonObject { ["ok"] = false, ["error"] = $"exit code {exitCode}: {error.ToString().Trim()}" };
+
+            // NOTE: with --json the result is the last thing printed
+            string text = output.ToString();
+            int start = text.IndexOf('{');
+            if (start < 0)
+                return new JsonObject { ["ok"] = false, ["error"] = $"no json in output: {text.Trim()}" };
+
+            return new JsonObject { ["ok"] = true, ["output"] = JsonNode.Parse(text.Substring(start)) };
+        }
+    }
+}
@@ -0,0 +1,96 @@
+"""stand-in for the osu-tools worker (tools/osu-tools-worker), speaks the same json-lines protocol
+without dotnet, so the pool can be run and broken on purpose anywhere.
+
+usage, in config.py:
+    OsuToolsWorker = ['python', '-m', 'tools.osu_tools_stub', '--delay', '0.05']
+
+pp and stars are made up but stable for the same map and arguments.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import sys
+import time
+import orjson
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+def max_combo(osu_file_path: str) -> int:
+    """number of hit objects, close enough for a stub."""
+    try:
+        lines = Path(osu_file_path).read_text(encoding="utf-8", errors="ignore").splitlines()
+    except OSError:
+        return 0
+
+    try:
+        start = lines.index("[HitObjects]") + 1
+    except ValueError:
+        return 0
+
+    return sum(1 for line in lines[start:] if line.strip())
+
+def simulate(args: List[str]) -> Dict[str, Any]:
+    if len(args) < 3 or args[0] != "simulate":
+        raise ValueError(f"unsupported command: {' '.join(args)}")
+
+    osu_file_path = args[2]
+    if not Path(osu_file_path).is_file():
+        raise FileNotFoundError(f"beatmap not found: {osu_file_path}")
+
+    # NOTE: same arguments, same answer
+    seed = int.from_bytes(hashlib.md5(" ".join(args).encode()).digest()[:4], "little")
+    stars = 2.0 + (seed % 600) / 100
+    acc = float(args[args.index("-a") + 1]) if "-a" in args else 100.0
+    mods = [args[i + 1] for i, arg in enumerate(args) if arg == "-m"]
+
+    pp = stars ** 2.2 * 8 * (acc / 100) ** 5
+    for mod in mods:
+        pp *= {"HD": 1.06, "HR": 1.1, "DT": 1.4, "NC": 1.4, "FL": 1.12, "EZ": 0.5, "HT": 0.3, "NF": 0.9}.get(mod, 1.0)
+
+    return {
+        "performance_attributes": {"pp": round(pp, 3)},
+        "difficulty_attributes": {"star_rating": round(stars, 3), "max_combo": max_combo(osu_file_path)},
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="fake osu-tools worker for testing the pool")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds per simulate request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests never answered (timeouts)")
+    parser.add_argument("--crash-after", type=int, default=0, help="exit after this many requests (restarts)")
+    args = parser.parse_args()
+
+    handled = 0
+    for line in sys.stdin.buffer:
+        if not line.strip():
+            continue
+
+        request = orjson.loads(line)
+        response: Dict[str, Any] = {"id": request.get("id")}
+
+        if request.get("ping"):
+            response["ok"] = True
+        elif random.random() < args.hang_rate:
+            continue
+        elif random.random() < args.error_rate:
+            response.update(ok=False, error="stub error")
+        else:
+            time.sleep(args.delay)
+            try:
+                response.update(ok=True, output=simulate(request.get("args", [])))
+            except Exception as e:
+                response.update(ok=False, error=str(e))
+
+        sys.stdout.buffer.write(orjson.dumps(response) + b"\n")
+        sys.stdout.buffer.flush()
+
+        handled += 1
+        if args.crash_after and handled >= args.crash_after:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
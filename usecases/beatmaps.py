@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+import httpx
+import config
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.logging import log, Ansi
+
+class BeatmapMismatch(Exception):
+    """raised when downloaded content doesn't hash to the md5 we asked for."""
+
+class BeatmapDownloadError(Exception):
+    pass
+
+class BeatmapStore:
+    """content-addressed .osu store with lru garbage collection.
+
+    files live at `root/<first 2 chars of md5>/<md5>.osu`, so no directory
+    ends up with tens of thousands of entries.
+    """
+
+    # NOTE: dont rewrite mtimes on every single access, once in a while is enough for lru
+    TOUCH_INTERVAL = 60 * 60
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+
+        # md5 -> (last time the file's mtime was set, size), least recently used first
+        self._index: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def path_for(self, beatmap_md5: str) -> Path:
+        return self.root / beatmap_md5[:2] / f"{beatmap_md5}.osu"
+
+    def load_index(self) -> None:
+        """scan the store once at startup, moving old flat .data/<md5>.osu files into shards."""
+        self.root.mkdir(exist_ok=True)
+
+        migrated = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".osu"):
+                shard = self.root / entry.name[:2]
+                shard.mkdir(exist_ok=True)
+                os.replace(entry.path, shard / entry.name)
+                migrated += 1
+
+        if migrated:
+            log(f"moved {migrated} beatmaps into the sharded store", Ansi.LCYAN)
+
+        entries: list[tuple[float, str, int]] = []
+
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+
+            for file in os.scandir(shard.path):
+                if file.name.endswith(".osu"):
+                    stat = file.stat()
+                    entries.append((stat.st_mtime, file.name[:-4], stat.st_size))
+                elif file.name.startswith(".tmp"):
+                    # XXX: leftover from a crash mid-write
+                    os.unlink(file.path)
+
+        with self._lock:
+            self._index.clear()
+            for touched, beatmap_md5, size in sorted(entries):
+                self._index[beatmap_md5] = (touched, size)
+            self.total_bytes = sum(size for _, size in self._index.values())
+
+        log(f"beatmap store has {len(self._index)} maps ({self.total_bytes / 1024 ** 2:.1f} MB)", Ansi.LCYAN)
+        self.gc()
+
+    def get(self, beatmap_md5: str) -> Optional[str]:
+        """path of a stored beatmap (and mark it as used), or None."""
+        with self._lock:
+            entry = self._index.get(beatmap_md5)
+            if entry is None:
+                return None
+
+            # NOTE: the order is what evicts, the mtime only has to survive a restart roughly right
+            now = time.time()
+            touched, size = entry
+            touch = now - touched > self.TOUCH_INTERVAL
+            if touch:
+                self._index[beatmap_md5] = (now, size)
+            self._index.move_to_end(beatmap_md5)
+
+        path = self.path_for(beatmap_md5)
+
+        if touch:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # NOTE: someone deleted it behind our back
+                self._forget(beatmap_md5)
+                return None
+
+        return str(path)
+
+    def put(self, beatmap_md5: str, content: bytes) -> str:
+        """verify and atomically write a beatmap, returns its path."""
+        if hashlib.md5(content).hexdigest() != beatmap_md5:
+            raise BeatmapMismatch(f"downloaded beatmap doesn't match md5 {beatmap_md5}")
+
+        path = self.path_for(beatmap_md5)
+        path.parent.mkdir(exist_ok=True)
+
+        # NOTE: write next to the target and rename, so readers never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            old = self._index.pop(beatmap_md5, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+            self._index[beatmap_md5] = (time.time(), len(content))
+            self.total_bytes += len(content)
+
+        self.gc()
+        return str(path)
+
+    async def store(self, beatmap_md5: str, content: bytes) -> str:
+        return await asyncio.to_thread(self.put, beatmap_md5, content)
+
+    def _forget(self, beatmap_md5: str) -> None:
+        with self._lock:
+            entry = self._index.pop(beatmap_md5, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def gc(self) -> None:
+        """delete least recently used maps until we're under the byte budget."""
+        removed = 0
+
+        while True:
+            with self._lock:
+                # NOTE: never delete the map we just wrote
+                if self.total_bytes <= self.max_bytes or len(self._index) <= 1:
+                    break
+
+                beatmap_md5, (_, size) = self._index.popitem(last=False)
+                self.total_bytes -= size
+
+            try:
+                os.unlink(self.path_for(beatmap_md5))
+            except FileNotFoundError:
+                pass
+
+            removed += 1
+
+        if removed and config.DEBUG:
+            log(f"beatmap store gc removed {removed} maps", Ansi.LCYAN)
+
+class BeatmapDownloader:
+    """downloads .osu files into the store, one request per md5 no matter how many callers."""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, store: BeatmapStore, client: httpx.AsyncClient, max_concurrency: int, retries: int) -> None:
+        self.store = store
+        self.retries = retries
+
+        # NOTE: the long-lived "osu" pool from the http registry, keeps the tls connection warm
+        self.client = client
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.downloads = 0
+        self.coalesced = 0
+
+    async def fetch(self, beatmap_id: int, beatmap_md5: str) -> str:
+        """path to the .osu file, downloading it if we don't have it yet."""
+        filepath = self.store.get(beatmap_md5)
+        if filepath is not None:
+            return filepath
+
+        task = self._inflight.get(beatmap_md5)
+        if task is None:
+            task = asyncio.create_task(self._download(beatmap_id, beatmap_md5))
+            self._inflight[beatmap_md5] = task
+            task.add_done_callback(lambda t: self._download_done(beatmap_md5, t))
+        else:
+            self.coalesced += 1
+
+        # NOTE: shield so one impatient caller doesn't cancel the download for everyone else
+        return await asyncio.shield(task)
+
+    def _download_done(self, beatmap_md5: str, task: asyncio.Task) -> None:
+        self._inflight.pop(beatmap_md5, None)
+
+        # XXX: mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    async def _download(self, beatmap_id: int, beatmap_md5: str) -> str:
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self.client.get(f"/osu/{beatmap_id}")
+
+                    if response.status_code not in self.RETRY_STATUSES:
+                        if response.status_code != 200 or not response.content:
+                            raise BeatmapDownloadError(f"Failed to download beatmap with id {beatmap_id}")
+
+                        self.downloads += 1
+                        return await self.store.store(beatmap_md5, response.content)
+
+                    error: Exception = BeatmapDownloadError(
+                        f"osu.ppy.sh returned {response.status_code} for beatmap {beatmap_id}"
+                    )
+                except httpx.TransportError as e:
+                    error = e
+
+                if attempt == self.retries:
+                    raise BeatmapDownloadError(f"Failed to download beatmap with id {beatmap_id}: {error}")
+
+                # NOTE: exponential backoff with a bit of jitter
+                await asyncio.sleep((2 ** attempt) * 0.5 + random.uniform(0, 0.25))
+
+        raise AssertionError("unreachable")
+
+def create_beatmap_downloader(store: BeatmapStore, client: httpx.AsyncClient) -> BeatmapDownloader:
+    return BeatmapDownloader(
+        store=store,
+        client=client,
+        max_concurrency=getattr(config, 'BeatmapDownloadConcurrency', 4),
+        retries=getattr(config, 'BeatmapDownloadRetries', 2),
+    )
+
+def create_beatmap_store() -> BeatmapStore:
+    return BeatmapStore(
+        root=Path(getattr(config, 'BeatmapStoreDir', '.data')),
+        max_bytes=getattr(config, 'BeatmapStoreMaxBytes', 1024 ** 3),
+    )
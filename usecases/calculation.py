@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import config
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.logging import log, Ansi
+from usecases.performance import (
+    calculate_performances,
+    beatmap_cache,
+    ScoreParams,
+    PerformanceResult,
+)
+from usecases.pp_cache import ResultCache, score_key, calculator_version
+
+class CalculationBusy(Exception):
+    """raised when too many calculations are already queued."""
+
+class CalculationTimeout(Exception):
+    """raised when a calculation took longer than the configured timeout."""
+
+def _calculate_job(
+    osu_file_path: str,
+    scores: list[ScoreParams],
+    beatmap_md5: str | None,
+) -> Tuple[list[PerformanceResult], Tuple[int, int, int]]:
+    """runs inside a worker process."""
+    results = calculate_performances(osu_file_path, scores, beatmap_md5)
+
+    # NOTE: each worker has its own beatmap cache, report it back so !info can show something
+    return results, (os.getpid(), beatmap_cache.hits, beatmap_cache.misses)
+
+class CalculationService:
+    """async pp calculation backed by a process pool, so the event loop never blocks on rust."""
+
+    def __init__(self, workers: int, max_queue: int, timeout: float, recycle_after: int,
+                 results: Optional[ResultCache] = None, background_slots: Optional[int] = None) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        # NOTE: background jobs (prefetching) only run while fewer than this many jobs are in flight
+        self.background_slots = background_slots if background_slots is not None else workers
+        self.timeout = timeout
+        self.recycle_after = recycle_after
+        self.results = results
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs_since_recycle = 0
+        # executor -> jobs still waiting on it; a pool retired with a stuck worker is killed once it hits zero
+        self._in_flight: Dict[ProcessPoolExecutor, int] = {}
+        # NOTE: shutdown() forgets the pool's processes, so retired pools with jobs left keep them here
+        self._retired: Dict[ProcessPoolExecutor, List[multiprocessing.Process]] = {}
+        self._stuck: Set[ProcessPoolExecutor] = set()
+
+        self.pending = 0
+        self.background_pending = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.recycles = 0
+
+        # pid -> (hits, misses) of that worker's beatmap cache
+        self._worker_cache_stats: Dict[int, Tuple[int, int]] = {}
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # NOTE: spawn instead of fork, forking a process with a live gateway connection is asking for trouble
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = self._new_executor()
+            log(f"started pp calculation pool with {self.workers} workers", Ansi.LCYAN)
+
+            if self.results is not None:
+                self.results.open()
+
+    def _recycle(self, kill: bool = False, stuck: bool = False) -> None:
+        """swap in a fresh pool; the old one finishes its jobs (or gets killed) in the background.
+        a `stuck` pool still finishes the jobs other commands are waiting on and is killed after."""
+        old = self._executor
+        self._executor = self._new_executor()
+        self._jobs_since_recycle = 0
+        self.recycles += 1
+
+        if old is None:
+            return
+
+        # XXX: there's no public api to kill a stuck worker, so reach into the pool
+        processes = list((old._processes or {}).values())
+        old.shutdown(wait=False, cancel_futures=kill)
+
+        if kill:
+            self._kill(processes)
+            return
+
+        if self._in_flight.get(old):
+            self._retired[old] = processes
+        if stuck:
+            # NOTE: _release kills it once the last job waiting on it is done
+            self._stuck.add(old)
+
+    def _kill(self, processes: List[multiprocessing.Process]) -> None:
+        for process in processes:
+            process.terminate()
+
+    def _release(self, executor: ProcessPoolExecutor) -> None:
+        left = self._in_flight[executor] - 1
+        if left:
+            self._in_flight[executor] = left
+            return
+
+        del self._in_flight[executor]
+        processes = self._retired.pop(executor, [])
+        if executor in self._stuck:
+            self._stuck.discard(executor)
+            self._kill(processes)
+
+    async def calculate(
+        self,
+        osu_file_path: str,
+        scores: Iterable[ScoreParams],
+        beatmap_md5: str | None = None,
+        background: bool = False,
+    ) -> list[PerformanceResult]:
+        """calculate performances for a beatmap, only the uncached scores reach a worker process.
+        `background` jobs never take a slot a user's command could need, they get CalculationBusy instead."""
+        scores = list(scores)
+
+        # NOTE: without the md5 we can't tell maps apart, so just calculate
+        if self.results is None or beatmap_md5 is None:
+            return await self._submit(osu_file_path, scores, beatmap_md5, background)
+
+        keys = [score_key(beatmap_md5, score) for score in scores]
+        cached = await self.results.get_many(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        if missing:
+            calculated = await self._submit(osu_file_path, [scores[i] for i in missing], beatmap_md5, background)
+            fresh = {keys[i]: result for i, result in zip(missing, calculated)}
+
+            await self.results.put_many(fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    async def _submit(
+        self,
+        osu_file_path: str,
+        scores: list[ScoreParams],
+        beatmap_md5: str | None,
+        background: bool = False,
+    ) -> list[PerformanceResult]:
+        return await self._run(_calculate_job, osu_file_path, scores, beatmap_md5, background=background)
+
+    async def _run(self, job: Callable[..., Tuple[Any, Tuple[int, int, int]]], osu_file_path: str, *args: Any,
+                   background: bool = False) -> Any:
+        if background:
+            # NOTE: checked per job, a prefetched page is several of them
+            if self.pending >= self.background_slots:
+                raise CalculationBusy("pp calculation pool is busy")
+        # XXX: background jobs don't count here, so prefetching can never get a user's command refused
+        elif self.pending - self.background_pending >= self.max_queue:
+            self.rejected += 1
+            raise CalculationBusy("too many pp calculations queued, try again in a bit")
+
+        if self._executor is None:
+            self.start()
+
+        if self._jobs_since_recycle >= self.recycle_after:
+            self._recycle()
+
+        executor = self._executor
+        self._jobs_since_recycle += 1
+        self.pending += 1
+        self.background_pending += background
+        self._in_flight[executor] = self._in_flight.get(executor, 0) + 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(executor, job, osu_file_path, *args)
+            results, (pid, hits, misses) = await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log(f"pp calculation for {osu_file_path} timed out after {self.timeout}s", Ansi.YELLOW)
+            # NOTE: we can't tell which worker is stuck, so the whole pool gets replaced, but the
+            #      jobs already on it are other commands' and keep running until they're done
+            if executor is self._executor:
+                self._recycle(stuck=True)
+            else:
+                self._stuck.add(executor)
+            raise CalculationTimeout(f"pp calculation timed out after {self.timeout}s")
+        except BrokenProcessPool:
+            log("pp calculation pool broke, restarting it", Ansi.YELLOW)
+            if executor is self._executor:
+                self._recycle(kill=True)
+            raise
+        finally:
+            self.pending -= 1
+            self.background_pending -= background
+            self._release(executor)
+
+        self.completed += 1
+        self._worker_cache_stats[pid] = (hits, misses)
+
+        return results
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(hits for hits, _ in self._worker_cache_stats.values())
+
+    @property
+    def cache_misses(self) -> int:
+        return sum(misses for _, misses in self._worker_cache_stats.values())
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+        for executor in self._stuck:
+            self._kill(self._retired.get(executor, []))
+        self._stuck.clear()
+
+        if self.results is not None:
+            self.results.close()
+
+def create_calculation_service() -> CalculationService:
+    results = ResultCache(
+        path=getattr(config, 'ResultCacheDB', 'pp_cache.db'),
+        max_entries=getattr(config, 'ResultCacheMaxEntries', 10_000),
+        version=calculator_version(),
+    )
+
+    return CalculationService(
+        workers=getattr(config, 'CalcWorkers', 2),
+        max_queue=getattr(config, 'CalcMaxQueue', 32),
+        timeout=getattr(config, 'CalcTimeout', 30.0),
+        recycle_after=getattr(config, 'CalcRecycleAfter', 500),
+        results=results,
+        background_slots=getattr(config, 'CalcBackgroundSlots', None),
+    )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import httpx
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.logging import log, Ansi
+from utils.OsuMapping import safe_name
+from utils.repository import write_behind
+from utils.prefixHelper import get_guild_settings
+from commands.osu.OsuApi.models import ApiError, PlayerProfile
+from objects import glob
+
+# NOTE: what !lb can sort by -> (column, descending)
+METRICS: Dict[str, Tuple[str, bool]] = {
+    "pp": ("pp", True),
+    "acc": ("acc", True),
+    "rank": ("rank", False),
+    "plays": ("plays", True),
+}
+
+class LeaderboardJob:
+    """refreshes leaderboard_stats for every registered user in a guild the bot is in.
+    one get_player_info("all") per (server, player) covers every mode."""
+
+    def __init__(self, concurrency: int) -> None:
+        self.concurrency = concurrency
+
+        self.runs = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run: Optional[float] = None
+        self.last_duration = 0.0
+
+    async def targets(self, guilds: Iterable) -> Set[Tuple[str, str]]:
+        """(server, name) of every registered member, on their guild's server."""
+        # NOTE: profiles and servers can still be sitting in the write-behind queue
+        await write_behind.flush()
+
+        guilds = list(guilds)
+
+        # XXX: only look up the members we can see, not every row in users and guilds
+        member_ids = {member.id for guild in guilds for member in guild.members}
+        users = await registered_names(member_ids)
+
+        targets: Set[Tuple[str, str]] = set()
+        for guild in guilds:
+            server = (await get_guild_settings(guild.id)).server
+            if server not in glob.servers:
+                server = glob.servers.default
+
+            for member in guild.members:
+                name = users.get(member.id)
+                if name is not None:
+                    targets.add((server, name))
+
+        return targets
+
+    async def run(self, guilds: Iterable) -> None:
+        started = time.monotonic()
+        targets = await self.targets(guilds)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(server: str, name: str) -> None:
+            async with semaphore:
+                try:
+                    profile = await glob.servers.get(server).get_player_info("all", username=name)
+                except (httpx.HTTPError, ApiError) as e:
+                    # NOTE: a 404 is just someone who set a name that doesn't exist on this server
+                    if not (isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 404):
+                        log(f"failed to refresh leaderboard stats for {name} on {server}: {e}", Ansi.YELLOW)
+                    self.failed += 1
+                    return
+
+            await self.save(server, profile)
+            self.refreshed += 1
+
+        # XXX: gather with return_exceptions so one bad row doesn't stop the others
+        results = await asyncio.gather(*(refresh(server, name) for server, name in targets), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.failed += 1
+                log(f"failed to save leaderboard stats: {result}", Ansi.YELLOW)
+
+        self.runs += 1
+        self.last_run = time.time()
+        self.last_duration = time.monotonic() - started
+        log(f"refreshed leaderboard stats for {len(targets)} players in {self.last_duration:.1f}s", Ansi.LCYAN)
+
+    async def save(self, server: str, profile: PlayerProfile) -> None:
+        if not profile.stats:
+            return
+
+        rows: List[object] = []
+        for mode, stats in profile.stats.items():
+            rows += [server, safe_name(profile.info.name), mode, profile.info.id, profile.info.name,
+                     stats.pp, stats.acc, stats.rank, stats.plays]
+
+        # NOTE: one statement for every mode of the player
+        await glob.db.execute(
+            'insert into leaderboard_stats (server, safe_name, mode, player_id, name, pp, acc, `rank`, plays) '
+            'values ' + ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(profile.stats)) + ' '
+            'on duplicate key update player_id = values(player_id), name = values(name), pp = values(pp), '
+            'acc = values(acc), `rank` = values(`rank`), plays = values(plays)',
+            rows, idempotent=True)
+
+# NOTE: member ids per `in (...)`, big guilds take a few round trips instead of one huge statement
+MEMBER_CHUNK = 1000
+
+async def registered_names(member_ids: Iterable[int]) -> Dict[int, str]:
+    """!setprofile names of the given discord users, only the ones that set one."""
+    member_ids = list(member_ids)
+    names: Dict[int, str] = {}
+
+    for i in range(0, len(member_ids), MEMBER_CHUNK):
+        chunk = member_ids[i:i + MEMBER_CHUNK]
+        rows = await glob.db.fetchall(
+            f'select id, name from users where id in ({", ".join(["%s"] * len(chunk))})', chunk
+        )
+        names.update((row['id'], row['name']) for row in rows if row['name'])
+
+    return names
+
+async def guild_leaderboard(server: str, mode: int, names: Iterable[str], metric: str) -> List[dict]:
+    """precomputed stats of the given players, best first."""
+    safe_names = sorted({safe_name(name) for name in names})
+    if not safe_names:
+        return []
+
+    column, descending = METRICS[metric]
+
+    # XXX: rank 0 means unranked (inactive / restricted), keep them out of the rank board
+    unranked = ' and `rank` > 0' if column == 'rank' else ''
+
+    return await glob.db.fetchall(
+        'select name, pp, acc, `rank`, plays, updated_at from leaderboard_stats '
+        f'where server = %s and mode = %s and safe_name in ({", ".join(["%s"] * len(safe_names))}){unranked} '
+        f'order by `{column}` {"desc" if descending else "asc"}',
+        [server, mode, *safe_names])
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import config
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from commands.osu.OsuApi.models import Beatmap, MapScore, Score, decode_map_scores
+from utils.OsuMapping import safe_name
+from objects import glob
+
+# (server, beatmap md5, mode)
+BoardKey = Tuple[str, str, int]
+
+@dataclass
+class MapLeaderboard:
+    beatmap: Beatmap
+    mode: int
+    scores: Dict[int, MapScore] = field(default_factory=dict) # player id -> their best
+    names: Dict[str, int] = field(default_factory=dict) # safe name -> player id
+    calcs: Dict[int, Any] = field(default_factory=dict) # score id -> fc calculation
+    newest_id: int = 0 # NOTE: only moves once the scores up to it are on the board with their calcs
+    refreshed_at: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def find(self, username: str) -> Optional[MapScore]:
+        player_id = self.names.get(safe_name(username))
+        return self.scores.get(player_id) if player_id is not None else None
+
+    def rank(self, entry: MapScore) -> int:
+        """1-based position on the board, sorted like bancho.py does (pp for rx/ap, score for vanilla)."""
+        if self.mode >= 4:
+            return 1 + sum(1 for other in self.scores.values() if other.score.pp > entry.score.pp)
+
+        return 1 + sum(1 for other in self.scores.values() if other.score.score > entry.score.score)
+
+    def merge(self, entries: List[MapScore]) -> List[Score]:
+        """add best scores to the board, returns the ones that weren't on it yet."""
+        added = []
+
+        for entry in entries:
+            current = self.scores.get(entry.player_id)
+            if current is not None and current.score.id >= entry.score.id:
+                continue
+
+            if current is not None:
+                self.calcs.pop(current.score.id, None)
+
+            self.scores[entry.player_id] = entry
+            self.names[safe_name(entry.player_name)] = entry.player_id
+            added.append(entry.score)
+
+        return added
+
+class MapScoreIndex:
+    """per-map leaderboards, loaded once and then refreshed from the map's recent scores.
+    fc pp for every score is calculated in one batch when it's added, so !c on a hot map never calculates."""
+
+    def __init__(self, calculate: Callable[[List[Score]], Awaitable[List[Any]]],
+                 ttl: float, refresh_limit: int, max_boards: int) -> None:
+        self.calculate = calculate
+        self.ttl = ttl
+        self.refresh_limit = refresh_limit
+        self.max_boards = max_boards
+
+        self._boards: OrderedDict[BoardKey, MapLeaderboard] = OrderedDict()
+
+        self.hits = 0
+        self.full_loads = 0
+        self.refreshes = 0
+
+    def __len__(self) -> int:
+        return len(self._boards)
+
+    async def get(self, server: str, beatmap: Beatmap, mode: int) -> MapLeaderboard:
+        key = (server, beatmap.md5, mode)
+
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = MapLeaderboard(beatmap, mode)
+
+            while len(self._boards) > self.max_boards:
+                self._boards.popitem(last=False)
+        else:
+            self._boards.move_to_end(key)
+
+        # NOTE: the lock makes everyone asking for the same map wait on one refresh
+        async with board.lock:
+            if time.monotonic() - board.refreshed_at < self.ttl:
+                self.hits += 1
+                return board
+
+            try:
+                if board.refreshed_at == 0.0 or not await self._refresh(server, board):
+                    await self._load(server, board)
+            except BaseException:
+                if board.refreshed_at == 0.0:
+                    # XXX: don't keep an empty board around that looks loaded
+                    self._boards.pop(key, None)
+                raise
+
+            board.refreshed_at = time.monotonic()
+
+        return board
+
+    async def _load(self, server: str, board: MapLeaderboard) -> None:
+        self.full_loads += 1
+
+        data = await glob.servers.get(server).get_map_scores(
+            "best", md5=board.beatmap.md5, mode_arg=board.mode, limit=100
+        )
+
+        entries = decode_map_scores(data, board.beatmap)
+
+        board.scores.clear()
+        board.names.clear()
+        board.calcs.clear()
+        board.newest_id = 0
+
+        board.merge(entries)
+        await self._calculate_missing(board)
+        board.newest_id = max((entry.score.id for entry in entries), default=0)
+
+    async def _refresh(self, server: str, board: MapLeaderboard) -> bool:
+        """pull only the latest scores on the map, False if we might have missed some and need a full load."""
+        self.refreshes += 1
+
+        data = await glob.servers.get(server).get_map_scores(
+            "recent", md5=board.beatmap.md5, mode_arg=board.mode, limit=self.refresh_limit
+        )
+        entries = decode_map_scores(data, board.beatmap)
+
+        new = [entry for entry in entries if entry.score.id > board.newest_id]
+        if len(new) >= self.refresh_limit:
+            return False # XXX: every recent score is new, there might be more behind them
+
+        board.merge([entry for entry in new if entry.score.status == 2])
+        await self._calculate_missing(board)
+        board.newest_id = max((entry.score.id for entry in new), default=board.newest_id)
+        return True
+
+    async def _calculate_missing(self, board: MapLeaderboard) -> None:
+        """fc calcs for every score on the board that doesn't have one yet, including ones a failed refresh left behind."""
+        scores = [entry.score for entry in board.scores.values() if entry.score.id not in board.calcs]
+        if not scores:
+            return
+
+        calcs = await self.calculate(scores)
+        for score, calc in zip(scores, calcs):
+            board.calcs[score.id] = calc
+
+def create_map_score_index(calculate: Callable[[List[Score]], Awaitable[List[Any]]]) -> MapScoreIndex:
+    return MapScoreIndex(
+        calculate=calculate,
+        ttl=getattr(config, 'MapScoresTTL', 60.0),
+        refresh_limit=getattr(config, 'MapScoresRefreshLimit', 10),
+        max_boards=getattr(config, 'MapScoresMaxBoards', 256),
+    )
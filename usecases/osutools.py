@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import orjson
+import config
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from utils.logging import log, Ansi
+from usecases.performance import ScoreParams, build_simulate_args
+
+# NOTE: persistent osu-tools workers, instead of one `dotnet simulate` process per score.
+#
+#       a worker is any executable that reads one json request per line on stdin
+#       and writes one json response per line on stdout:
+#
+#       -> {"id": 1, "args": ["simulate", "osu", "/path/map.osu", "-m", "HD", "--json"]}
+#       <- {"id": 1, "ok": true, "output": { ...PerformanceCalculator --json output... }}
+#       <- {"id": 1, "ok": false, "error": "something broke"}
+#
+#       -> {"id": 2, "ping": true}
+#       <- {"id": 2, "ok": true}
+#
+#       responses may come back in any order, they are matched by id.
+#       osu-tools doesn't ship this mode, so `OsuToolsWorker` in the config points to
+#       tools/osu-tools-worker (a small host around PerformanceCalculator), or to
+#       tools/osu_tools_stub.py for testing without dotnet.
+
+class OsuToolsError(Exception):
+    pass
+
+class OsuToolsWorker:
+    """a single long-lived calculator process."""
+
+    def __init__(self, command: Sequence[str], name: str) -> None:
+        self.command = list(command)
+        self.name = name
+
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._write_lock = asyncio.Lock()
+        self.restart_lock = asyncio.Lock()
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._read_loop())
+
+        if config.DEBUG:
+            log(f"started osu-tools worker {self.name} (pid {self.process.pid})", Ansi.LCYAN)
+
+    async def _read_loop(self) -> None:
+        assert self.process is not None and self.process.stdout is not None
+
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+
+                try:
+                    response = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # XXX: dotnet likes to print random stuff, just skip it
+                    if config.DEBUG:
+                        log(f"osu-tools worker {self.name}: {line!r}", Ansi.GRAY)
+                    continue
+
+                future = self._pending.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+
+                if response.get("ok"):
+                    future.set_result(response.get("output"))
+                else:
+                    future.set_exception(OsuToolsError(response.get("error", "unknown error")))
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(OsuToolsError(f"worker {self.name} exited"))
+            self._pending.clear()
+
+    async def request(self, payload: Dict[str, Any], timeout: float) -> Any:
+        if not self.is_alive:
+            raise OsuToolsError(f"worker {self.name} is not running")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        try:
+            try:
+                async with self._write_lock:
+                    self.process.stdin.write(orjson.dumps({"id": request_id, **payload}) + b"\n")
+                    await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                # NOTE: died between is_alive and the write, the health check restarts it
+                raise OsuToolsError(f"worker {self.name} went away: {e}")
+
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            await self.request({"ping": True}, timeout)
+            return True
+        except (OsuToolsError, asyncio.TimeoutError, ConnectionError):
+            return False
+
+    async def stop(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+
+        if self._reader is not None:
+            self._reader.cancel()
+
+class OsuToolsPool:
+    """a few warm osu-tools workers with health checks and automatic restarts."""
+
+    def __init__(self, command: Sequence[str], size: int, timeout: float, health_interval: float) -> None:
+        self.command = list(command)
+        self.timeout = timeout
+        self.health_interval = health_interval
+
+        self.workers = [OsuToolsWorker(self.command, f"osu-tools-{i}") for i in range(size)]
+        self._health_task: Optional[asyncio.Task] = None
+
+        self.restarts = 0
+
+    async def start(self) -> None:
+        for worker in self.workers:
+            await worker.start()
+
+        self._health_task = asyncio.create_task(self._health_loop())
+        log(f"started {len(self.workers)} osu-tools workers", Ansi.LCYAN)
+
+    async def _restart(self, worker: OsuToolsWorker, process: Optional[asyncio.subprocess.Process]) -> None:
+        """replace `process`, the one the caller saw misbehave, unless someone already did."""
+        # XXX: the health check and a timed out request can both get here for the same worker,
+        #      the second one would otherwise stop the fresh process or leak one of the two
+        async with worker.restart_lock:
+            if worker.process is not process:
+                return
+
+            log(f"restarting osu-tools worker {worker.name}", Ansi.YELLOW)
+            self.restarts += 1
+
+            await worker.stop()
+            await worker.start()
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(self.health_interval)
+
+                for worker in self.workers:
+                    process = worker.process
+                    if not worker.is_alive or not await worker.ping(self.timeout):
+                        await self._restart(worker, process)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log(f"error in osu-tools health check: {e}", Ansi.YELLOW)
+
+    def _pick_worker(self) -> OsuToolsWorker:
+        alive = [worker for worker in self.workers if worker.is_alive]
+        if not alive:
+            raise OsuToolsError("no osu-tools workers are running")
+
+        return min(alive, key=lambda worker: worker.load)
+
+    async def _simulate_one(self, osu_file_path: str, score: ScoreParams) -> Dict[str, Any]:
+        args = [*build_simulate_args(osu_file_path, score), '--json']
+        worker = self._pick_worker()
+        process = worker.process
+
+        try:
+            output = await worker.request({"args": args}, self.timeout)
+        except asyncio.TimeoutError:
+            # NOTE: a stuck worker is useless, dont wait for the health check
+            await self._restart(worker, process)
+            raise OsuToolsError(f"osu-tools timed out after {self.timeout}s")
+
+        try:
+            performance = output.get("performance_attributes", {})
+            difficulty = output.get("difficulty_attributes", {})
+
+            return {
+                "performance": {
+                    "pp": float(performance.get("pp", 0.0))
+                },
+                "difficulty": {
+                    "stars": float(difficulty.get("star_rating", 0.0)),
+                    "max_combo": float(difficulty.get("max_combo", 0.0))
+                },
+            }
+        except (AttributeError, TypeError, ValueError) as e:
+            raise OsuToolsError(f"unexpected osu-tools output: {e}")
+
+    async def simulate(self, osu_file_path: str, scores: Iterable[ScoreParams]) -> List[Dict[str, Any]]:
+        """same result shape as `calculate_osu_tools`, but spread over the warm workers."""
+        return list(await asyncio.gather(*(
+            self._simulate_one(osu_file_path, score) for score in scores
+        )))
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+
+        for worker in self.workers:
+            await worker.stop()
+
+def create_osu_tools_pool() -> Optional[OsuToolsPool]:
+    command = getattr(config, 'OsuToolsWorker', None)
+    if not command:
+        return None
+
+    return OsuToolsPool(
+        command=command,
+        size=getattr(config, 'OsuToolsWorkers', 1),
+        timeout=getattr(config, 'OsuToolsTimeout', 15.0),
+        health_interval=getattr(config, 'OsuToolsHealthInterval', 30.0),
+    )
@@ -10,6 +10,7 @@ import subprocess
 import os
 import config
 
+from collections import OrderedDict
 from collections.abc import Iterable
 from dataclasses import dataclass
 from typing import TypedDict, Iterable, Dict, Any, Tuple
@@ -70,84 +71,158 @@ class PerformanceResult(TypedDict):
     performance: Performance
     difficulty: Difficulty
 
-def calculate_performances(osu_file_path: str, scores: Iterable[ScoreParams]) -> list[PerformanceResult]:
-    calc_ = Beatmap(path=osu_file_path)
+class BeatmapCache:
+    """size-bounded lru of parsed beatmaps, keyed by beatmap md5."""
 
-    results: list[PerformanceResult] = []
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
 
-    for score in scores:
-        if score.acc and (
-            score.n300 or score.n100 or score.n50 or score.ngeki or score.nkatu
+        # NOTE: md5 -> (parsed beatmap, .osu file size)
+        #       we can't measure the rust object itself, so the file size is our best guess
+        self._entries: OrderedDict[str, Tuple[Beatmap, int]] = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, osu_file_path: str, beatmap_md5: str | None = None) -> Beatmap:
+        """get a parsed beatmap, parsing the .osu file on a miss."""
+        # XXX: cached files are named {md5}.osu so the stem works as a fallback key
+        key = beatmap_md5 or Path(osu_file_path).stem
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+
+        beatmap = Beatmap(path=osu_file_path)
+        size = os.path.getsize(osu_file_path)
+
+        self._entries[key] = (beatmap, size)
+        self.total_bytes += size
+        self._evict()
+
+        return beatmap
+
+    def invalidate(self, beatmap_md5: str) -> None:
+        entry = self._entries.pop(beatmap_md5, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def _evict(self) -> None:
+        # NOTE: always keep the newest entry, even if it alone is over the byte budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes
         ):
-            raise ValueError(
-                "Must not specify accuracy AND 300/100/50/geki/katu. Only one or the other.",
-            )
-
-        if score.mods is not None:
-            if score.mods & Mods.NIGHTCORE.value:
-                score.mods |= Mods.DOUBLETIME.value
-
-        calculator = Calculator(
-            mode=score.mode % 4,
-            mods=score.mods or 0,
-            combo=score.combo,
-            acc=score.acc,
-            n300=score.n300,
-            n100=score.n100,
-            n50=score.n50,
-            n_geki=score.ngeki,
-            n_katu=score.nkatu,
-            n_misses=score.nmiss,
-            # NOTE: for refx
-            shaymi_mode=True if score.mode > 3 else False
+            _, (_, size) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+beatmap_cache = BeatmapCache(
+    max_entries=getattr(config, 'BeatmapCacheMaxEntries', 256),
+    max_bytes=getattr(config, 'BeatmapCacheMaxBytes', 64 * 1024 ** 2),
+)
+
+def _make_calculator(score: ScoreParams) -> Calculator:
+    if score.acc and (
+        score.n300 or score.n100 or score.n50 or score.ngeki or score.nkatu
+    ):
+        raise ValueError(
+            "Must not specify accuracy AND 300/100/50/geki/katu. Only one or the other.",
         )
 
+    if score.mods is not None:
+        if score.mods & Mods.NIGHTCORE.value:
+            score.mods |= Mods.DOUBLETIME.value
+
+    calculator = Calculator(
+        mode=score.mode % 4,
+        mods=score.mods or 0,
+        combo=score.combo,
+        acc=score.acc,
+        n300=score.n300,
+        n100=score.n100,
+        n50=score.n50,
+        n_geki=score.ngeki,
+        n_katu=score.nkatu,
+        n_misses=score.nmiss,
         # NOTE: for refx
-        if score.mode > 3:
-            calculator.cheat_ac(0 if score.AC is None or score.AC < 1 else score.AC)
-            calculator.cheat_arc(score.AR if score.AR is not None else 0)
-            calculator.cheat_tw(int(150 if score.TW < 1 else score.TW))
-            calculator.cheat_cs(bool(score.CS))
-            calculator.cheat_hdr(bool(score.HD))
-        else:
-            calculator.cheat_ac(0 if score.AC is None or score.AC < 1 else score.AC)
-            calculator.cheat_arc(score.AR if score.AR is not None else 0)
-            calculator.cheat_hdr(bool(score.HD))
-
-        result = calculator.performance(calc_)
-
-        pp = result.pp
-
-        if math.isnan(pp) or math.isinf(pp):
-            pp = 0.0
-        else:
-            pp = round(pp, 3)
-
-        results.append(
-            {
-                "performance": {
-                    "pp": pp,
-                    "pp_acc": result.pp_acc,
-                    "pp_aim": result.pp_aim,
-                    "pp_speed": result.pp_speed,
-                    "pp_flashlight": result.pp_flashlight,
-                    "effective_miss_count": result.effective_miss_count,
-                    "pp_difficulty": result.pp_difficulty,
-                },
-                "difficulty": {
-                    "stars": result.difficulty.stars,
-                    "aim": result.difficulty.aim,
-                    "speed": result.difficulty.speed,
-                    "flashlight": result.difficulty.flashlight,
-                    "slider_factor": result.difficulty.slider_factor,
-                    "speed_note_count": result.difficulty.speed_note_count,
-                    "stamina": result.difficulty.stamina,
-                    "color": result.difficulty.color,
-                    "rhythm": result.difficulty.rhythm,
-                    "peak": result.difficulty.peak,
-                },
-            },
-        )
+        shaymi_mode=True if score.mode > 3 else False
+    )
+
+    # NOTE: for refx
+    if score.mode > 3:
+        calculator.cheat_ac(0 if score.AC is None or score.AC < 1 else score.AC)
+        calculator.cheat_arc(score.AR if score.AR is not None else 0)
+        calculator.cheat_tw(int(150 if score.TW < 1 else score.TW))
+        calculator.cheat_cs(bool(score.CS))
+        calculator.cheat_hdr(bool(score.HD))
+    else:
+        calculator.cheat_ac(0 if score.AC is None or score.AC < 1 else score.AC)
+        calculator.cheat_arc(score.AR if score.AR is not None else 0)
+        calculator.cheat_hdr(bool(score.HD))
+
+    return calculator
+
+def _to_difficulty(attrs: Any) -> Difficulty:
+    return {
+        "stars": attrs.stars,
+        "aim": attrs.aim,
+        "speed": attrs.speed,
+        "flashlight": attrs.flashlight,
+        "slider_factor": attrs.slider_factor,
+        "speed_note_count": attrs.speed_note_count,
+        "stamina": attrs.stamina,
+        "color": attrs.color,
+        "rhythm": attrs.rhythm,
+        "peak": attrs.peak,
+    }
+
+def _to_performance_result(result: Any) -> PerformanceResult:
+    pp = result.pp
+
+    if math.isnan(pp) or math.isinf(pp):
+        pp = 0.0
+    else:
+        pp = round(pp, 3)
+
+    return {
+        "performance": {
+            "pp": pp,
+            "pp_acc": result.pp_acc,
+            "pp_aim": result.pp_aim,
+            "pp_speed": result.pp_speed,
+            "pp_flashlight": result.pp_flashlight,
+            "effective_miss_count": result.effective_miss_count,
+            "pp_difficulty": result.pp_difficulty,
+        },
+        "difficulty": _to_difficulty(result.difficulty),
+    }
+
+def calculate_performances(osu_file_path: str, scores: Iterable[ScoreParams],
+                           beatmap_md5: str | None = None) -> list[PerformanceResult]:
+    calc_ = beatmap_cache.get(osu_file_path, beatmap_md5)
+
+    results: list[PerformanceResult] = []
+
+    for score in scores:
+        calculator = _make_calculator(score)
+        results.append(_to_performance_result(calculator.performance(calc_)))
 
     return results
 
@@ -197,6 +272,48 @@ def parse_performance_output(output: str) -> Tuple[float, Dict[str, float]]:
     
     return pp_value, performance
 
+# TODO: dont make the mod mapping here??
+osu_tools_modes = {
+    0: "osu",
+    1: "taiko",
+    2: "catch",
+    3: "mania"
+}
+
+def build_simulate_args(osu_file_path: str, score: ScoreParams) -> list[str]:
+    """PerformanceCalculator `simulate` arguments for a score (without the dotnet/dll part)"""
+    args = [
+        'simulate',
+        osu_tools_modes.get(score.mode % 4, 'osu'),
+        osu_file_path
+    ]
+
+    if score.n50 is not None:
+        args.extend(['-M', str(score.n50)])
+
+    if score.mode % 4 == 3:
+        if score.combo is not None:
+            args.extend(['-s', str(score.combo)])
+    else:
+        if score.combo is not None:
+            args.extend(['-c', str(score.combo)])
+        if score.nmiss is not None:
+            args.extend(['-X', str(score.nmiss)])
+
+    if score.mode % 4 not in [2, 3] and score.n100 is not None:
+        args.extend(['-G', str(score.n100)])
+
+    if score.acc is not None:
+        args.extend(['-a', str(score.acc)])
+
+    if score.mods is not None:
+        for mod_str, mod_value in modstr2mod_dict.items():
+            # XXX: remove nc because dt is always active if nc is active
+            if score.mods & mod_value.value and mod_str not in {"NM", "V2", "NC"}:
+                args.extend(['-m', mod_str])
+
+    return args
+
 def calculate_osu_tools(osu_file_path: str, scores: Iterable[ScoreParams], osu_tools_base_path: str = '../osu-tools') -> list[Dict[str, Any]]:
     """
     Calculate performance using osu-tools
@@ -222,47 +339,9 @@ def calculate_osu_tools(osu_file_path: str, scores: Iterable[ScoreParams], osu_t
     
     results: list[Dict[str, Any]] = []
 
-    # TODO: dont make the mod mapping here??
-    mode_mapping = {
-        0: "osu",
-        1: "taiko",
-        2: "catch",
-        3: "mania"
-    }
-
     for score in scores:
         try:
-            cmd = [
-                'dotnet',
-                calculator_path,
-                'simulate',
-                mode_mapping.get(score.mode, 'osu'),
-                osu_file_path
-            ]
-            
-            if score.n50 is not None:
-                cmd.extend(['-M', str(score.n50)])
-            
-            if score.mode == 3:
-                if score.combo is not None:
-                    cmd.extend(['-s', str(score.combo)])
-            else:
-                if score.combo is not None:
-                    cmd.extend(['-c', str(score.combo)])
-                if score.nmiss is not None:
-                    cmd.extend(['-X', str(score.nmiss)])
-            
-            if score.mode not in [2, 3] and score.n100 is not None:
-                cmd.extend(['-G', str(score.n100)])
-            
-            if score.acc is not None:
-                cmd.extend(['-a', str(score.acc)])
-            
-            if score.mods is not None:
-                for mod_str, mod_value in modstr2mod_dict.items():
-                    # XXX: remove nc because dt is always active if nc is active
-                    if score.mods & mod_value.value and mod_str not in {"NM", "V2", "NC"}:
-                        cmd.extend(['-m', mod_str])
+            cmd = ['dotnet', calculator_path, *build_simulate_args(osu_file_path, score)]
             
             try:
                 calc_process = subprocess.run(
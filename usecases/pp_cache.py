@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import orjson
+
+from collections import OrderedDict
+from dataclasses import asdict
+from importlib import metadata
+from typing import Dict, Iterable, List, Optional
+
+from utils.logging import log, Ansi
+from utils.OsuMapping import Mods
+from usecases.performance import ScoreParams, PerformanceResult
+
+def calculator_version() -> str:
+    """version of the pp calculator, cached results from other versions are thrown away."""
+    try:
+        return metadata.version("refx-pp-py")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def score_key(beatmap_md5: str, score: ScoreParams) -> str:
+    """canonical hash of everything that changes the calculated performance."""
+    params = asdict(score)
+
+    # NOTE: same normalization calculate_performances does, so NC and NCDT share an entry
+    if params['mods'] is not None and params['mods'] & Mods.NIGHTCORE.value:
+        params['mods'] |= Mods.DOUBLETIME.value
+
+    # XXX: the api gives us 99 or 99.0 depending on the mood, dont let that split the cache
+    for field in ('acc', 'AR'):
+        if params[field] is not None:
+            params[field] = round(float(params[field]), 4)
+
+    for field in ('CS', 'HD'):
+        if params[field] is not None:
+            params[field] = bool(params[field])
+
+    return hashlib.sha1(
+        orjson.dumps([beatmap_md5, params], option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+class ResultCache:
+    """two-tier (memory lru -> sqlite) cache of performance results."""
+
+    def __init__(self, path: Optional[str], max_entries: int, version: str) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version
+
+        self._memory: OrderedDict[str, PerformanceResult] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def open(self) -> None:
+        if self.path is None:
+            return
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db_lock, self._db:
+            self._db.execute(
+                'create table if not exists results ('
+                'key text primary key, version text not null, result blob not null)'
+            )
+            stale = self._db.execute('delete from results where version != ?', [self.version]).rowcount
+
+        if stale:
+            log(f"dropped {stale} cached pp results from an older calculator", Ansi.LCYAN)
+
+    def _remember(self, key: str, result: PerformanceResult) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, PerformanceResult]:
+        if self._db is None or not keys:
+            return {}
+
+        with self._db_lock:
+            rows = self._db.execute(
+                f'select key, result from results where version = ? and key in ({", ".join("?" * len(keys))})',
+                [self.version, *keys]
+            ).fetchall()
+
+        return {key: orjson.loads(result) for key, result in rows}
+
+    def _disk_put(self, items: Dict[str, PerformanceResult]) -> None:
+        if self._db is None or not items:
+            return
+
+        with self._db_lock, self._db:
+            self._db.executemany(
+                'insert or replace into results (key, version, result) values (?, ?, ?)',
+                [(key, self.version, orjson.dumps(result)) for key, result in items.items()]
+            )
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, PerformanceResult]:
+        found: Dict[str, PerformanceResult] = {}
+        missing: List[str] = []
+
+        for key in keys:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                found[key] = result
+            else:
+                missing.append(key)
+
+        if missing:
+            from_disk = await asyncio.to_thread(self._disk_get, missing)
+            self.disk_hits += len(from_disk)
+            self.misses += len(missing) - len(from_disk)
+
+            for key, result in from_disk.items():
+                self._remember(key, result)
+                found[key] = result
+
+        return found
+
+    async def put_many(self, items: Dict[str, PerformanceResult]) -> None:
+        for key, result in items.items():
+            self._remember(key, result)
+
+        try:
+            await asyncio.to_thread(self._disk_put, items)
+        except sqlite3.Error as e:
+            # NOTE: the memory tier still has it, not worth failing the command over
+            log(f"failed to store pp results on disk: {e}", Ansi.YELLOW)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
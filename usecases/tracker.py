@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+from utils.logging import log, Ansi
+from objects import glob
+
+K = TypeVar("K")
+
+# (server, player id, mode)
+TrackKey = Tuple[str, int, int]
+
+@dataclass
+class TrackedPlayer:
+    server: str
+    player_id: int
+    mode: int
+    name: str
+    last_score_id: Optional[int] = None
+    last_played: Optional[datetime] = None
+    subscriptions: Dict[int, float] = field(default_factory=dict) # channel id -> min pp
+
+    @property
+    def key(self) -> TrackKey:
+        return (self.server, self.player_id, self.mode)
+
+def next_interval(last_played: Optional[datetime], found_new: bool,
+                  min_interval: float, max_interval: float, activity_divisor: float = 10.0) -> float:
+    """seconds until the next poll: right away-ish for someone mid-session, rarely for someone who quit."""
+    if found_new:
+        return min_interval
+
+    if last_played is None:
+        return max_interval
+
+    # NOTE: played 10 minutes ago -> every minute, 5 hours ago -> every 30 minutes
+    idle = (datetime.now() - last_played).total_seconds()
+    return min(max_interval, max(min_interval, idle / activity_divisor))
+
+class PollScheduler(Generic[K]):
+    """runs `poll(key)` for every registered key when it's due, at most `concurrency` at once.
+    `poll` returns the delay until that key should be polled again."""
+
+    def __init__(self, poll: Callable[[K], Awaitable[float]], concurrency: int, error_delay: float) -> None:
+        self.poll = poll
+        self.error_delay = error_delay
+
+        self._heap: List[Tuple[float, int, K]] = []
+        self._due: Dict[K, float] = {}
+        self._keys: Set[K] = set()
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.polls = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: K, delay: float = 0.0) -> None:
+        self._keys.add(key)
+        self._schedule(key, delay)
+
+    def remove(self, key: K) -> None:
+        # NOTE: the heap entry stays behind and gets skipped once it's popped
+        self._keys.discard(key)
+        self._due.pop(key, None)
+
+    def _schedule(self, key: K, delay: float) -> None:
+        due = time.monotonic() + delay
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._seq), key))
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        try:
+            while True:
+                now = time.monotonic()
+
+                while self._heap and self._heap[0][0] <= now:
+                    due, _, key = heapq.heappop(self._heap)
+                    if self._due.get(key) != due:
+                        continue # removed or rescheduled since
+
+                    del self._due[key]
+
+                    # NOTE: backpressure, due keys just wait here until a slot frees up
+                    await self._semaphore.acquire()
+                    task = asyncio.create_task(self._poll(key))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                    now = time.monotonic()
+
+                self._wakeup.clear()
+                timeout = self._heap[0][0] - now if self._heap else None
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    async def _poll(self, key: K) -> None:
+        try:
+            delay = await self.poll(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            log(f"tracker poll for {key} failed: {e}", Ansi.YELLOW)
+            delay = self.error_delay
+        finally:
+            self.polls += 1
+            self._semaphore.release()
+
+        if key in self._keys and key not in self._due:
+            self._schedule(key, delay)
+
+class TrackerStore:
+    """tracked players and channel subscriptions in mysql."""
+
+    async def load(self) -> Dict[TrackKey, TrackedPlayer]:
+        players: Dict[TrackKey, TrackedPlayer] = {}
+
+        for row in await glob.db.fetchall('select server, player_id, mode, name, last_score_id, last_played from tracked_players'):
+            player = TrackedPlayer(
+                server=row['server'],
+                player_id=row['player_id'],
+                mode=row['mode'],
+                name=row['name'],
+                last_score_id=row['last_score_id'],
+                last_played=row['last_played'],
+            )
+            players[player.key] = player
+
+        for row in await glob.db.fetchall('select channel_id, server, player_id, mode, min_pp from tracking'):
+            player = players.get((row['server'], row['player_id'], row['mode']))
+            if player is not None:
+                player.subscriptions[row['channel_id']] = row['min_pp']
+
+        return players
+
+    async def guild_count(self, guild_id: int) -> int:
+        row = await glob.db.fetch('select count(*) as count from tracking where guild_id = %s', [guild_id])
+        return row['count'] if row else 0
+
+    # NOTE: every write here sets fixed values by key, safe to replay after a dropped connection
+    async def subscribe(self, player: TrackedPlayer, guild_id: int, channel_id: int, min_pp: float) -> None:
+        await glob.db.execute(
+            'insert into tracked_players (server, player_id, mode, name, last_score_id, last_played) '
+            'values (%s, %s, %s, %s, %s, %s) '
+            'on duplicate key update name = %s',
+            [player.server, player.player_id, player.mode, player.name,
+             player.last_score_id, player.last_played, player.name], idempotent=True)
+
+        await glob.db.execute(
+            'insert into tracking (channel_id, guild_id, server, player_id, mode, min_pp) '
+            'values (%s, %s, %s, %s, %s, %s) '
+            'on duplicate key update min_pp = %s',
+            [channel_id, guild_id, player.server, player.player_id, player.mode, min_pp, min_pp], idempotent=True)
+
+    async def unsubscribe(self, player: TrackedPlayer, channel_id: int) -> None:
+        await glob.db.execute(
+            'delete from tracking where channel_id = %s and server = %s and player_id = %s and mode = %s',
+            [channel_id, player.server, player.player_id, player.mode], idempotent=True)
+
+        if not player.subscriptions:
+            await glob.db.execute(
+                'delete from tracked_players where server = %s and player_id = %s and mode = %s',
+                [player.server, player.player_id, player.mode], idempotent=True)
+
+    async def save_progress(self, player: TrackedPlayer) -> None:
+        await glob.db.execute(
+            'update tracked_players set last_score_id = %s, last_played = %s '
+            'where server = %s and player_id = %s and mode = %s',
+            [player.last_score_id, player.last_played, player.server, player.player_id, player.mode], idempotent=True)
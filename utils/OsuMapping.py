@@ -144,4 +144,8 @@ grade_emojis = {
     'S': '<:grade_s:1239381654665957377>', 
     'X': '<:grade_ss:1239381649649700964>', 
     'F': '<:grade_f:1239381657543512106>'
-}
\ No newline at end of file
+}
+
+def safe_name(name: str) -> str:
+    """bancho.py's safe name, how usernames are compared."""
+    return name.lower().replace(' ', '_')
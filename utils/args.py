@@ -1,31 +1,66 @@
 from __future__ import annotations
 
+import re
+
 from utils.OsuMapping import Mode
+from utils.serverHelper import ServerHelper
+from utils.profileHelper import ProfileHelper
 
 from typing import Tuple, Optional
 from discord.ext import commands
 from objects import glob
 
+# NOTE: `!rs ano +rx!std -s refx.online`
+SERVER_ARG = re.compile(r'(?:^|\s)-s\s+(\S+)')
+
 class ArgParsing:
     def __init__(self) -> None:
         """for the annoying args parsing"""
         self.mode = Mode
 
+    async def parse_server(self, ctx: commands.Context, args: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """pull a `-s <server>` override out of the args, otherwise use the guild's default server.
+        returns (server, remaining args), server is None if the override was invalid."""
+        if args:
+            match = SERVER_ARG.search(args)
+            if match:
+                server = match.group(1)
+                args = (args[:match.start()] + args[match.end():]).strip() or None
+
+                if server not in glob.servers:
+                    await ctx.send(f"unknown server, available: {', '.join(f'`{s}`' for s in glob.servers.servers)}")
+                    return None, args
+
+                return server, args
+
+        server = None
+        if ctx.guild is not None:
+            try:
+                server = await ServerHelper().get_server(ctx.guild.id)
+            except Exception:
+                # XXX: dont break osu commands just because the guild lookup failed
+                pass
+
+        # NOTE: the guild might point at a server that got removed from the config
+        return server if server in glob.servers else glob.servers.default, args
+
     async def parse_args(self, ctx: commands.Context, args: str) -> Tuple[Optional[str], Optional[int]]:
-        user_id = str(ctx.author.id)
+        user_id = ctx.author.id
         username = ""
         mode = 0
+        profiles = ProfileHelper()
 
         mentioned_users = ctx.message.mentions
         mentioned_users = [user for user in mentioned_users if user.id != ctx.bot.user.id]
 
         if mentioned_users:  # NOTE: !pf @user
-            mentioned_user = str(mentioned_users[0].id)
+            mentioned_user = mentioned_users[0].id
             try:
-                result = await glob.db.fetch('select name, mode from users where id = %s', [mentioned_user])
+                # NOTE: one query for every mention, the rest are cached for whoever asks next
+                result = (await profiles.get_profiles(user.id for user in mentioned_users))[mentioned_user]
                 if result:
-                    username = result['name']
-                    mode = result['mode']
+                    username = result.name
+                    mode = result.mode
                 else:
                     await ctx.send(f"user <@{mentioned_user}> not found in the database.")
                     return None, None
@@ -48,10 +83,10 @@ class ArgParsing:
                         username = args.strip()
 
             if not username:
-                result = await glob.db.fetch('select name, mode from users where id = %s', [user_id])
+                result = await profiles.get_profile(user_id)
                 if result:
-                    username = result['name']
-                    mode = result['mode'] if mode == 0 else mode
+                    username = result.name
+                    mode = result.mode if mode == 0 else mode
                 else:
                     await ctx.send("no profile set. Use `!setprofile <name> (mode)` to set a default profile.")
                     return None, None
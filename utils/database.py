@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+import aiomysql
+import config
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from cmyui.mysql import AsyncSQLPool
+from pymysql.err import InterfaceError, OperationalError
+
+from utils.logging import log, Ansi
+
+# NOTE: pool settings that can go in config.db_config next to the credentials
+POOL_DEFAULTS: Dict[str, Any] = {
+    'minsize': 1,
+    'maxsize': 10,
+    # XXX: below mysql's wait_timeout (8h by default) so we never hand out a connection the server dropped
+    'pool_recycle': 3600,
+}
+
+# mysql client errors that mean the connection is gone, not that the statement was wrong
+# 2003 can't connect, 2006 server has gone away, 2013 lost connection during query, 2055 lost connection at handshake
+CONNECTION_ERRORS = {2003, 2006, 2013, 2055}
+
+def is_connection_error(e: BaseException) -> bool:
+    if isinstance(e, (ConnectionError, asyncio.IncompleteReadError, InterfaceError)):
+        return True
+
+    return isinstance(e, OperationalError) and bool(e.args) and e.args[0] in CONNECTION_ERRORS
+
+# NOTE: histogram bucket upper bounds in ms, the last one catches everything slower
+BUCKETS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*%s\s*,)*\s*%s\s*\)")
+_PLACEHOLDER_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize(query: str) -> str:
+    """statement text without the parts that change per call, so `in (%s, %s)` and `in (%s)` group together."""
+    query = _WHITESPACE.sub(" ", query).strip().lower()
+    query = _PLACEHOLDER_LIST.sub("(...)", query)
+    query = _PLACEHOLDER_ROWS.sub("(...)", query)
+    return _LITERALS.sub("?", query)
+
+def redact(params: Sequence[Any]) -> str:
+    """what was passed without the values, user names and ids don't belong in logs."""
+    types = [type(param).__name__ for param in params]
+    if len(types) > 8:
+        return f"[{', '.join(types[:8])}, ... {len(types)} params]"
+
+    return f"[{', '.join(types)}]"
+
+class StatementStats:
+    __slots__ = ("calls", "errors", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0 # ms
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+        for i, bound in enumerate(BUCKETS):
+            if elapsed <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, p: float) -> float:
+        """upper bound of the bucket the p-th percentile falls in."""
+        wanted = self.calls * p
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max)
+
+        return self.max
+
+class QueryStats:
+    """latency per normalized statement for everything that goes through glob.db."""
+
+    # NOTE: statements past this are counted together, a query built from user input can't grow this forever
+    OTHER = "<other statements>"
+
+    def __init__(self, slow_ms: float, max_statements: int) -> None:
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.statements: Dict[str, StatementStats] = {}
+        self.slow = 0
+
+    def record(self, query: str, params: Sequence[Any], elapsed: float, failed: bool) -> None:
+        statement = normalize(query)
+
+        stats = self.statements.get(statement)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                statement = self.OTHER
+                stats = self.statements.get(statement)
+
+            if stats is None:
+                stats = self.statements[statement] = StatementStats()
+
+        stats.add(elapsed, failed)
+
+        if self.slow_ms is not None and elapsed >= self.slow_ms:
+            self.slow += 1
+            log(f"slow query ({elapsed:.0f}ms): {statement} {redact(params)}", Ansi.YELLOW)
+
+    def top(self, limit: int) -> List[Tuple[str, StatementStats]]:
+        return sorted(self.statements.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.slow = 0
+
+# NOTE: process-wide, survives the pool being rebuilt by check_db_connection
+query_stats = QueryStats(
+    slow_ms=getattr(config, 'SlowQueryMs', 250.0),
+    max_statements=getattr(config, 'QueryStatsMaxStatements', 500),
+)
+
+class Database(AsyncSQLPool):
+    """AsyncSQLPool that sizes and recycles its pool from db_config and survives dropped connections.
+    reads (and writes passed with idempotent=True) are retried once on a fresh connection."""
+
+    def __init__(self, retries: int = 1) -> None:
+        super().__init__()
+        self.retries = retries
+
+        self.acquires = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.retried = 0
+        self.connection_errors = 0
+
+    async def connect(self, config: Dict[str, Any]) -> None:
+        settings = {**POOL_DEFAULTS, **config}
+        self.pool = await aiomysql.create_pool(**settings, autocommit=True)
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+
+    @property
+    def in_use(self) -> int:
+        return self.pool.size - self.pool.freesize if self.pool is not None else 0
+
+    @property
+    def idle(self) -> int:
+        return self.pool.freesize if self.pool is not None else 0
+
+    @property
+    def max_size(self) -> int:
+        return self.pool.maxsize if self.pool is not None else 0
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[aiomysql.Connection]:
+        started = time.monotonic()
+        async with self.pool.acquire() as conn:
+            waited = time.monotonic() - started
+            self.acquires += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+            try:
+                yield conn
+            except BaseException as e:
+                if is_connection_error(e):
+                    # NOTE: closed connections aren't put back into the pool on release
+                    conn.close()
+                raise
+
+    async def _run(self, query: str, params: Sequence[Any], idempotent: bool, fetch: Optional[str]) -> Any:
+        # NOTE: timed end to end (pool wait and retries included), that's what the command waiting on it sees
+        started = time.monotonic()
+        failed = True
+        try:
+            result = await self._attempt(query, params, idempotent, fetch)
+            failed = False
+            return result
+        finally:
+            query_stats.record(query, params, (time.monotonic() - started) * 1000, failed)
+
+    async def _attempt(self, query: str, params: Sequence[Any], idempotent: bool, fetch: Optional[str]) -> Any:
+        attempt = 0
+        while True:
+            try:
+                async with self._connection() as conn:
+                    async with conn.cursor(aiomysql.DictCursor) as cur:
+                        await cur.execute(query, params)
+
+                        if fetch == 'one':
+                            return await cur.fetchone()
+                        if fetch == 'all':
+                            return await cur.fetchall()
+
+                        return cur.lastrowid
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+
+                self.connection_errors += 1
+                if not idempotent or attempt >= self.retries:
+                    raise
+
+                # XXX: the server probably dropped every idle connection at once (restart, wait_timeout),
+                #      throw away the rest of them too so the retry really gets a fresh one
+                await self.pool.clear()
+
+                attempt += 1
+                self.retried += 1
+                log(f"mysql connection lost ({e}), retrying", Ansi.YELLOW)
+
+    async def execute(self, query: str, params: Sequence[Any] = [], idempotent: bool = False) -> int:
+        """run a write, returns the last row id. only retried when it's safe to run twice."""
+        return await self._run(query, params, idempotent, None)
+
+    async def fetch(self, query: str, params: Sequence[Any] = []) -> Optional[Dict[str, Any]]:
+        return await self._run(query, params, True, 'one')
+
+    async def fetchall(self, query: str, params: Sequence[Any] = []) -> List[Dict[str, Any]]:
+        return await self._run(query, params, True, 'all')
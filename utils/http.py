@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import httpx
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from utils.logging import log, Ansi
+
+@dataclass
+class PoolConfig:
+    base_url: str = ""
+    timeout: float = 10.0
+    max_connections: int = 10
+    max_keepalive: int = 5
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    follow_redirects: bool = True
+    warmup_url: Optional[str] = None # NOTE: requested at startup so dns + tls are done before the first command
+
+class HttpClientRegistry:
+    """named, process-wide httpx client pools. everything that talks http should get its client here."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 overrides: Optional[Dict[str, dict]] = None) -> None:
+        # NOTE: `transport` routes every pool through one transport, tools/mock_bancho.py uses it
+        self.transport = transport
+        # NOTE: config.HttpPools, applied to every pool registered here, including ones registered later
+        self.overrides = overrides or {}
+        self._configs: Dict[str, PoolConfig] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def register(self, name: str, pool: PoolConfig) -> None:
+        if name in self._clients:
+            raise ValueError(f"http pool {name} is already in use")
+
+        # XXX: "bancho" applies to every "bancho:<server>" pool, the full name wins over it
+        family = name.split(":", 1)[0]
+        for key, value in {**self.overrides.get(family, {}), **self.overrides.get(name, {})}.items():
+            setattr(pool, key, value)
+
+        self._configs[name] = pool
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        pool = self._configs.get(name)
+        if pool is None:
+            raise KeyError(f"unknown http pool {name}")
+
+        client = self._clients[name] = httpx.AsyncClient(
+            base_url=pool.base_url,
+            timeout=pool.timeout,
+            http2=pool.http2,
+            follow_redirects=pool.follow_redirects,
+            limits=httpx.Limits(
+                max_connections=pool.max_connections,
+                max_keepalive_connections=pool.max_keepalive,
+                keepalive_expiry=pool.keepalive_expiry,
+            ),
+            transport=self.transport,
+        )
+        return client
+
+    async def _warmup_one(self, name: str, url: str) -> None:
+        try:
+            await self.get(name).head(url)
+        except httpx.HTTPError as e:
+            log(f"failed to warm up http pool {name}: {e}", Ansi.YELLOW)
+
+    async def warmup(self) -> None:
+        await asyncio.gather(*(
+            self._warmup_one(name, pool.warmup_url)
+            for name, pool in self._configs.items()
+            if pool.warmup_url is not None
+        ))
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+
+        self._clients.clear()
+
+def create_http_registry(overrides: Dict[str, dict],
+                         transport: Optional[httpx.AsyncBaseTransport] = None) -> HttpClientRegistry:
+    """registry with the pools every cog uses, `overrides` is config.HttpPools."""
+    pools = {
+        "osu": PoolConfig(base_url="https://osu.ppy.sh", max_connections=4, max_keepalive=4, warmup_url="/"),
+        "lastfm": PoolConfig(base_url="http://ws.audioscrobbler.com", timeout=30.0, max_connections=5, max_keepalive=2),
+        "dictionary": PoolConfig(base_url="https://api.dictionaryapi.dev/api/v2/", timeout=2.0, max_connections=5, max_keepalive=2),
+        "random_word": PoolConfig(base_url="https://random-word-api.herokuapp.com", timeout=2.0, max_connections=2, max_keepalive=1),
+    }
+
+    registry = HttpClientRegistry(transport, overrides)
+
+    for name, pool in pools.items():
+        registry.register(name, pool)
+
+    return registry
@@ -1,23 +1,130 @@
 from __future__ import annotations
 
+import time
+import config
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from utils.logging import log, Ansi
+from utils.repository import GuildRepository, DELETED
 from objects import glob
 
+DEFAULT_PREFIX = '!'
+
+class GuildSettings(NamedTuple):
+    prefix: str
+    server: Optional[str] # NOTE: None means the default server
+
+DEFAULT_SETTINGS = GuildSettings(DEFAULT_PREFIX, None)
+
+class GuildCache:
+    """every guild's prefix and server in memory, so resolving either never touches mysql.
+    writes go through PrefixHelper/ServerHelper, `ttl` only guards against someone editing the table by hand."""
+
+    def __init__(self, ttl: Optional[float]) -> None:
+        self.ttl = ttl
+        self.loaded = False
+
+        # guild id -> (settings, cached at)
+        self._entries: Dict[int, Tuple[GuildSettings, float]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def load(self) -> None:
+        """one bulk query for every guild, at startup (and after a reconnect)."""
+        rows = await glob.db.fetchall('select guild_id, prefix, server from guilds')
+
+        now = time.monotonic()
+        self._entries = {row['guild_id']: (GuildSettings(row['prefix'], row['server']), now) for row in rows}
+        self.loaded = True
+
+        log(f"cached settings of {len(self._entries)} guilds", Ansi.LCYAN)
+
+    def get(self, guild_id: int) -> Optional[GuildSettings]:
+        """the cached settings, or None if we have to ask the database."""
+        entry = self._entries.get(guild_id)
+
+        if entry is None:
+            if self.loaded and self.ttl is None:
+                # NOTE: not in the table means the guild never changed anything
+                self.hits += 1
+                return DEFAULT_SETTINGS
+
+            self.misses += 1
+            return None
+
+        settings, cached_at = entry
+        if self.ttl is not None and time.monotonic() - cached_at > self.ttl:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return settings
+
+    def set(self, guild_id: int, settings: GuildSettings) -> None:
+        self._entries[guild_id] = (settings, time.monotonic())
+
+    def update(self, guild_id: int, **changes: Any) -> None:
+        """change some fields of a cached guild, forgets it if we don't know the rest."""
+        settings = self.get(guild_id)
+        if settings is None:
+            self.discard(guild_id)
+            return
+
+        self.set(guild_id, settings._replace(**changes))
+
+    def discard(self, guild_id: int) -> None:
+        self._entries.pop(guild_id, None)
+
+guild_cache = GuildCache(getattr(config, 'PrefixCacheTTL', None))
+
+async def get_guild_settings(guild_id: int) -> GuildSettings:
+    """cache, then queued writes over what's in mysql."""
+    settings = guild_cache.get(guild_id)
+    if settings is not None:
+        return settings
+
+    # NOTE: a queued write that hasn't reached mysql yet is newer than what's in there
+    pending = GuildRepository().pending(guild_id)
+    if pending is DELETED:
+        return DEFAULT_SETTINGS
+
+    if pending is not None and pending.replace:
+        # NOTE: the old row gets deleted first, mysql has nothing that still applies
+        settings = DEFAULT_SETTINGS
+    else:
+        result = await glob.db.fetch("select prefix, server from guilds where guild_id = %s", [guild_id])
+
+        # XXX: return the defaults if the guild never set anything
+        settings = GuildSettings(result['prefix'], result['server']) if result else DEFAULT_SETTINGS
+
+    if pending is not None:
+        settings = settings._replace(**{
+            column: value for column, value in {**pending.defaults, **pending.values}.items()
+            if column in GuildSettings._fields and (pending.replace or column in pending.values)
+        })
+
+    guild_cache.set(guild_id, settings)
+    return settings
+
 class PrefixHelper:
     def __init__(self):
-        pass
+        self.cache = guild_cache
+        self.guilds = GuildRepository()
     
     async def get_prefix(self, guild_id: int) -> str:
-        result = await glob.db.fetch("select prefix from guilds where guild_id = %s", [guild_id])
-        
-        # XXX: r\eturn default prefix if no custom prefix is set
-        return result['prefix'] if result else '!'
+        return (await get_guild_settings(guild_id)).prefix
     
     async def set_prefix(self, guild_id: int, prefix: str) -> None:
-        await glob.db.execute(
-            'insert into guilds (guild_id, prefix) '
-            'values (%s, %s) '
-            'on duplicate key update prefix = %s', 
-            [guild_id, prefix, prefix])
+        # NOTE: the cache answers right away, mysql catches up on the next write-behind flush
+        self.guilds.set_prefix(guild_id, prefix)
+        self.cache.update(guild_id, prefix=prefix)
     
     async def delete_prefix(self, guild_id: int) -> None:
-        await glob.db.execute("delete from guilds where guild_id = %s", [guild_id])
\ No newline at end of file
+        # XXX: drops the guild's row, so this resets the server too
+        self.guilds.delete(guild_id)
+        self.cache.set(guild_id, DEFAULT_SETTINGS)
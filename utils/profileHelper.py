@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import config
+
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from utils.repository import UserRepository, DELETED
+from objects import glob
+
+class UserProfile(NamedTuple):
+    name: str
+    mode: int
+
+_MISSING = object()
+
+class ProfileCache:
+    """bounded lru of discord id -> profile set with !setprofile.
+    users without a profile are cached too (as None), they're the ones who spam !rs without a name."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, Optional[UserProfile]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int):
+        """the cached profile, None for "has no profile", or _MISSING."""
+        entry = self._entries.get(user_id, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return _MISSING
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry
+
+    def put(self, user_id: int, profile: Optional[UserProfile]) -> None:
+        self._entries[user_id] = profile
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+profile_cache = ProfileCache(getattr(config, 'ProfileCacheMaxEntries', 4096))
+
+class ProfileHelper:
+    def __init__(self):
+        self.cache = profile_cache
+        self.users = UserRepository()
+
+    async def get_profile(self, user_id: int) -> Optional[UserProfile]:
+        return (await self.get_profiles([user_id]))[user_id]
+
+    async def get_profiles(self, user_ids: Iterable[int]) -> Dict[int, Optional[UserProfile]]:
+        """profiles of several users, everything not cached is fetched with one query."""
+        profiles: Dict[int, Optional[UserProfile]] = {}
+        missing = []
+
+        for user_id in dict.fromkeys(user_ids):
+            profile = self.cache.get(user_id)
+            if profile is not _MISSING:
+                profiles[user_id] = profile
+                continue
+
+            # NOTE: evicted from the cache but still waiting for the write-behind flush
+            pending = self.users.pending(user_id)
+            if pending is not None and pending is not DELETED:
+                profiles[user_id] = UserProfile(pending.values['name'], pending.values['mode'])
+                continue
+
+            missing.append(user_id)
+
+        if missing:
+            rows = await glob.db.fetchall(
+                f'select id, name, mode from users where id in ({", ".join(["%s"] * len(missing))})',
+                missing
+            )
+            found = {row['id']: UserProfile(row['name'], row['mode']) for row in rows}
+
+            for user_id in missing:
+                profiles[user_id] = found.get(user_id)
+                self.cache.put(user_id, profiles[user_id])
+
+        return profiles
+
+    async def set_profile(self, user_id: int, name: str, mode: int) -> None:
+        # NOTE: queued, reads are served from the cache (or the queue) until it's flushed
+        self.users.set_profile(user_id, name, mode)
+        self.cache.put(user_id, UserProfile(name, mode))
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import asyncio
+import config
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.logging import log, Ansi
+from objects import glob
+
+# NOTE: rows per statement when flushing, keeps packets well under max_allowed_packet
+CHUNK_SIZE = 500
+
+# returned by WriteBehind.pending for a row that's queued for deletion
+DELETED = object()
+
+Key = Tuple[Any, ...]
+
+class PendingRow:
+    __slots__ = ("values", "defaults", "replace")
+
+    def __init__(self, values: Dict[str, Any], defaults: Dict[str, Any], replace: bool = False) -> None:
+        self.values = values # written on insert and on update
+        self.defaults = defaults # only written when the row is new
+        # NOTE: queued after a delete of the same row, the delete runs first and this inserts a fresh row,
+        #       so columns that aren't in values/defaults are back to the table's defaults, not what mysql has
+        self.replace = replace
+
+    def merge(self, newer: PendingRow) -> None:
+        self.values.update(newer.values)
+        for column, value in newer.defaults.items():
+            self.defaults.setdefault(column, value)
+
+def build_upsert(table: str, key_columns: Sequence[str], insert_columns: Sequence[str],
+                 update_columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> Tuple[str, List[Any]]:
+    """one multi-row `insert ... on duplicate key update` statement."""
+    columns = [*key_columns, *insert_columns]
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    updates = ", ".join(f"`{column}` = values(`{column}`)" for column in update_columns)
+
+    query = (
+        f"insert into {table} ({', '.join(f'`{column}`' for column in columns)}) "
+        f"values {', '.join([placeholders] * len(rows))}"
+    )
+    if updates:
+        query += f" on duplicate key update {updates}"
+    else:
+        # XXX: nothing to update, just make the insert a no-op for existing rows
+        query += f" on duplicate key update `{key_columns[0]}` = `{key_columns[0]}`"
+
+    return query, [value for row in rows for value in row]
+
+class WriteBehind:
+    """queues writes that don't have to hit mysql right away and flushes them as batched upserts.
+    repeated writes to the same row are merged, so a row costs one statement slot per flush."""
+
+    def __init__(self, interval: float, max_pending: int) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+
+        # table -> key columns
+        self._keys: Dict[str, Tuple[str, ...]] = {}
+        # table -> key -> row
+        self._upserts: Dict[str, OrderedDict[Key, PendingRow]] = {}
+        self._deletes: Dict[str, Dict[Key, None]] = {}
+
+        # XXX: made in start(), this object is created at import time, before the bot's loop exists
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.flushes = 0
+        self.statements = 0
+        self.rows = 0
+        self.failures = 0
+
+    def register(self, table: str, key_columns: Sequence[str]) -> None:
+        self._keys[table] = tuple(key_columns)
+        self._upserts.setdefault(table, OrderedDict())
+        self._deletes.setdefault(table, {})
+
+    @property
+    def pending_count(self) -> int:
+        return sum(map(len, self._upserts.values())) + sum(map(len, self._deletes.values()))
+
+    def pending(self, table: str, key: Key) -> Any:
+        """the queued state of a row: a PendingRow (check .replace), DELETED, or None if nothing is queued."""
+        row = self._upserts[table].get(key)
+        if row is not None:
+            return row
+
+        return DELETED if key in self._deletes[table] else None
+
+    def upsert(self, table: str, key: Key, values: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> None:
+        # XXX: keep a queued delete, it has to run before this or the old row's other columns survive
+        row = PendingRow(dict(values), dict(defaults or {}), replace=key in self._deletes[table])
+
+        current = self._upserts[table].get(key)
+        if current is None:
+            self._upserts[table][key] = row
+        else:
+            current.merge(row)
+
+        self._maybe_flush()
+
+    def delete(self, table: str, key: Key) -> None:
+        self._upserts[table].pop(key, None)
+        self._deletes[table][key] = None
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if self._wakeup is not None and self.pending_count >= self.max_pending:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            # NOTE: close() does the last flush itself
+            if self._closing:
+                return
+
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            upserts, deletes = self._upserts, self._deletes
+            if not any(upserts.values()) and not any(deletes.values()):
+                return
+
+            # NOTE: swap the queues first, writes made while we flush go into the next batch
+            self._upserts = {table: OrderedDict() for table in self._keys}
+            self._deletes = {table: {} for table in self._keys}
+
+            try:
+                for table, rows in deletes.items():
+                    keys = list(rows)
+                    for i in range(0, len(keys), CHUNK_SIZE):
+                        await self._delete(table, keys[i:i + CHUNK_SIZE])
+
+                for table, rows in upserts.items():
+                    await self._upsert(table, rows)
+            except Exception as e:
+                self.failures += 1
+                self._requeue(upserts, deletes)
+                log(f"write-behind flush failed, {self.pending_count} writes kept for the next try: {e}", Ansi.RED)
+                return
+
+            self.flushes += 1
+
+    async def _delete(self, table: str, keys: List[Key]) -> None:
+        key_columns = self._keys[table]
+        condition = "(" + ", ".join(f"`{column}`" for column in key_columns) + ")"
+        placeholders = "(" + ", ".join(["%s"] * len(key_columns)) + ")"
+
+        await glob.db.execute(
+            f"delete from {table} where {condition} in ({', '.join([placeholders] * len(keys))})",
+            [value for key in keys for value in key],
+            idempotent=True
+        )
+        self.statements += 1
+        self.rows += len(keys)
+
+    async def _upsert(self, table: str, rows: Dict[Key, PendingRow]) -> None:
+        # NOTE: rows that touch the same columns can share a statement
+        groups: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], List[List[Any]]] = {}
+
+        for key, row in rows.items():
+            update_columns = tuple(sorted(row.values))
+            default_columns = tuple(sorted(set(row.defaults) - set(row.values)))
+            values = [*key, *(row.values[column] for column in update_columns),
+                      *(row.defaults[column] for column in default_columns)]
+            groups.setdefault((update_columns, default_columns), []).append(values)
+
+        for (update_columns, default_columns), group in groups.items():
+            for i in range(0, len(group), CHUNK_SIZE):
+                query, params = build_upsert(
+                    table, self._keys[table], [*update_columns, *default_columns], update_columns,
+                    group[i:i + CHUNK_SIZE]
+                )
+                await glob.db.execute(query, params, idempotent=True)
+                self.statements += 1
+                self.rows += len(group[i:i + CHUNK_SIZE])
+
+    def _requeue(self, upserts: Dict[str, OrderedDict[Key, PendingRow]], deletes: Dict[str, Dict[Key, None]]) -> None:
+        # XXX: a flush is all or nothing from our side, replaying upserts and deletes is harmless.
+        #      anything written since the swap is newer and goes on top of the failed batch
+        for table in self._keys:
+            failed_deletes = deletes.get(table, {})
+            failed_upserts = upserts.get(table, {})
+
+            for key in {*failed_deletes, *failed_upserts}:
+                if key in self._deletes[table]:
+                    continue # NOTE: deleted again since, that replaces whatever the failed batch had
+
+                row = failed_upserts.get(key)
+                newer = self._upserts[table].get(key)
+                if row is None:
+                    row = newer
+                elif newer is not None:
+                    row.merge(newer)
+
+                if key in failed_deletes:
+                    self._deletes[table][key] = None
+                    if row is not None:
+                        row.replace = True
+
+                if row is not None:
+                    self._upserts[table][key] = row
+
+    async def close(self) -> None:
+        # XXX: don't cancel the loop, a flush cancelled halfway through loses its batch without a requeue.
+        #      wake it up and let it finish whatever it's writing
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+
+        if self.pending_count:
+            log(f"lost {self.pending_count} queued writes on shutdown", Ansi.RED)
+
+write_behind = WriteBehind(
+    interval=getattr(config, 'WriteBehindInterval', 5.0),
+    max_pending=getattr(config, 'WriteBehindMaxPending', 500),
+)
+
+write_behind.register("guilds", ["guild_id"])
+write_behind.register("users", ["id"])
+
+class GuildRepository:
+    """guilds table, prefix and server changes are queued."""
+
+    def __init__(self) -> None:
+        self.writer = write_behind
+
+    def set_prefix(self, guild_id: int, prefix: str) -> None:
+        self.writer.upsert("guilds", (guild_id,), {"prefix": prefix})
+
+    def set_server(self, guild_id: int, server: Optional[str]) -> None:
+        self.writer.upsert("guilds", (guild_id,), {"server": server}, defaults={"prefix": "!"})
+
+    def delete(self, guild_id: int) -> None:
+        self.writer.delete("guilds", (guild_id,))
+
+    def pending(self, guild_id: int) -> Any:
+        return self.writer.pending("guilds", (guild_id,))
+
+class UserRepository:
+    """users table (!setprofile), profile updates are queued."""
+
+    def __init__(self) -> None:
+        self.writer = write_behind
+
+    def set_profile(self, user_id: int, name: str, mode: int) -> None:
+        self.writer.upsert("users", (user_id,), {"name": name, "mode": mode})
+
+    def set_profiles(self, profiles: Iterable[Tuple[int, str, int]]) -> None:
+        """mass import, still a handful of statements on the next flush."""
+        for user_id, name, mode in profiles:
+            self.set_profile(user_id, name, mode)
+
+    def pending(self, user_id: int) -> Any:
+        return self.writer.pending("users", (user_id,))
+
+class LastfmRepository:
+    """lastfm table, written right away since the next !fm reads it from mysql."""
+
+    async def get_username(self, user_id: int) -> Optional[str]:
+        row = await glob.db.fetch('select username from lastfm where id = %s', [user_id])
+        return row['username'] if row else None
+
+    async def set_username(self, user_id: int, username: str) -> None:
+        query, params = build_upsert("lastfm", ["id"], ["username"], ["username"], [[user_id, username]])
+        await glob.db.execute(query, params, idempotent=True)
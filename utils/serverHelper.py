@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from utils.repository import GuildRepository
+from utils.prefixHelper import guild_cache, get_guild_settings
+
+class ServerHelper:
+    def __init__(self):
+        self.cache = guild_cache
+        self.guilds = GuildRepository()
+
+    async def get_server(self, guild_id: int) -> Optional[str]:
+        # XXX: None means the guild uses the default server
+        return (await get_guild_settings(guild_id)).server
+
+    async def set_server(self, guild_id: int, server: Optional[str]) -> None:
+        self.guilds.set_server(guild_id, server)
+        self.cache.update(guild_id, server=server)